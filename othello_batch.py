@@ -0,0 +1,102 @@
+# othello_batch.py
+# This program evaluates many Othello positions at once with NumPy. Boards are stacked into one int8 array shaped
+# (N, rows, columns) holding 0 (empty), 1 (black) and -1 (white), with an int8 array of the N sides to move.
+# Legal move masks, flip counts, piece counts and winners are computed with whole-array shifts: the only Python
+# loops are over the eight directions and the ray length, never over boards. Requires NumPy.
+
+from collections import namedtuple
+
+import numpy
+
+from othello_logic import DIRECTIONS, OthelloGame
+
+
+BatchPieceCounts = namedtuple('BatchPieceCounts', 'empty black white')
+BatchResult = namedtuple('BatchResult', 'legal_moves flip_counts piece_counts winners')
+
+
+def stack_games(games: [OthelloGame]) -> tuple:
+    """Converts a list of OthelloGame objects of the same board size into a (boards, to_move) tuple of int8
+    arrays shaped (N, rows, columns) and (N,) for the batch functions."""
+
+    boards = numpy.array([game.board_state for game in games], dtype=numpy.int8)
+    to_move = numpy.array([game.whose_turn for game in games], dtype=numpy.int8)
+    return boards, to_move
+
+
+def _look(squares: numpy.ndarray, row_offset: int, column_offset: int) -> numpy.ndarray:
+    """Returns an array where every (row, column) of every board holds the value of squares at
+    (row + row_offset, column + column_offset), or False/0 where that square is off the board."""
+
+    rows, columns = squares.shape[1:]
+    looked = numpy.zeros_like(squares)
+    if abs(row_offset) >= rows or abs(column_offset) >= columns:
+        return looked
+    target_rows = slice(max(0, -row_offset), rows - max(0, row_offset))
+    target_columns = slice(max(0, -column_offset), columns - max(0, column_offset))
+    source_rows = slice(max(0, row_offset), rows - max(0, -row_offset))
+    source_columns = slice(max(0, column_offset), columns - max(0, -column_offset))
+    looked[:, target_rows, target_columns] = squares[:, source_rows, source_columns]
+    return looked
+
+
+def get_flip_counts(boards: numpy.ndarray, to_move: numpy.ndarray) -> numpy.ndarray:
+    """Returns an int array shaped like boards holding, for every empty square, the number of discs the side to move
+    would flip by playing there (the length of OthelloGame._get_flipped_pieces for that square). Occupied squares
+    hold 0. Each direction walks outwards one step at a time across all boards: a run of opponent discs closed by
+    one of the mover's discs at distance k flips k - 1 discs."""
+
+    boards = numpy.asarray(boards, dtype=numpy.int8)
+    side = numpy.asarray(to_move, dtype=numpy.int8).reshape(-1, 1, 1)
+    own = boards == side
+    opponent = boards == -side
+    rows, columns = boards.shape[1:]
+
+    flip_counts = numpy.zeros(boards.shape, dtype=numpy.int16)
+    for row_step, column_step in DIRECTIONS:
+        direction_flips = numpy.zeros(boards.shape, dtype=numpy.int16)
+        run = _look(opponent, row_step, column_step)
+        for distance in range(2, max(rows, columns)):
+            if not run.any():
+                break
+            closed = run & _look(own, row_step * distance, column_step * distance)
+            direction_flips[closed] = distance - 1
+            run &= _look(opponent, row_step * distance, column_step * distance)
+        flip_counts += direction_flips
+
+    flip_counts[boards != 0] = 0
+    return flip_counts
+
+
+def get_legal_moves(boards: numpy.ndarray, to_move: numpy.ndarray) -> numpy.ndarray:
+    """Returns a bool array shaped like boards that is True on every legal move of the side to move."""
+    return get_flip_counts(boards, to_move) > 0
+
+
+def get_piece_counts(boards: numpy.ndarray) -> BatchPieceCounts:
+    """Returns a BatchPieceCounts namedtuple of (N,) int arrays of the empty, black and white squares of every
+    board, in the same form as OthelloGame.get_piece_counts."""
+
+    boards = numpy.asarray(boards, dtype=numpy.int8)
+    return BatchPieceCounts((boards == 0).sum(axis=(1, 2)), (boards == 1).sum(axis=(1, 2)),
+                            (boards == -1).sum(axis=(1, 2)))
+
+
+def get_winners(boards: numpy.ndarray, winner_condition='>') -> numpy.ndarray:
+    """Returns an (N,) int8 array of the winner of every board as OthelloGame.get_winner would give it: 1 for black,
+    -1 for white and 0 where get_winner returns None (a tie). winner_condition is '>' (most discs wins) or '<'
+    (fewest discs wins), either one for every board or an (N,) array of them."""
+
+    piece_counts = get_piece_counts(boards)
+    leader = numpy.sign(piece_counts.black - piece_counts.white).astype(numpy.int8)
+    most_wins = numpy.asarray(winner_condition) == '>'
+    return numpy.where(most_wins, leader, -leader).astype(numpy.int8)
+
+
+def evaluate_boards(boards: numpy.ndarray, to_move: numpy.ndarray, winner_condition='>') -> BatchResult:
+    """Evaluates every board at once. Returns a BatchResult of the legal move masks, flip counts per candidate
+    move, piece counts and winners (see get_flip_counts, get_piece_counts and get_winners)."""
+
+    flip_counts = get_flip_counts(boards, to_move)
+    return BatchResult(flip_counts > 0, flip_counts, get_piece_counts(boards),
+                       get_winners(boards, winner_condition))
@@ -0,0 +1,271 @@
+# othello_benchmark.py
+# This program measures how many moves per second the Othello Game engines can replay. It records a set of
+# deterministic games for each board size and replays them through the list-of-lists OthelloGame and the
+# BitboardOthelloGame, checking along the way that both engines agree on every result.
+# With --suite it instead runs the OthelloGame microbenchmark suite: a fixed, seeded corpus of games and the
+# positions along them for every even square board from 4x4 to 16x16 under both winner conditions, timing
+# make_move, _get_flipped_pieces, _is_any_valid_moves, is_game_over, get_piece_counts and full-game replay.
+# The results can be saved as a JSON baseline (--save) and later runs compared against it (--compare), which
+# flags every measure that got slower than the baseline by more than --threshold. Nothing here needs Tk.
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from othello_logic import OthelloGame, build_start_board
+from othello_bitboard import BitboardOthelloGame
+import othello_search
+
+
+BENCHMARK_SIZES = [(4, 4), (8, 8), (6, 10), (12, 12), (16, 16)]
+GAMES_PER_SIZE = 20
+
+SUITE_SIZES = [(size, size) for size in range(4, 17, 2)]
+SUITE_WINNER_CONDITIONS = ('>', '<')
+SUITE_MEASURES = ('make_move', '_get_flipped_pieces', '_is_any_valid_moves', 'is_game_over', 'get_piece_counts',
+                  'replay')
+SUITE_SEED = 20240
+SUITE_GAMES = 3
+SUITE_ROUNDS = 5
+SUITE_REPEATS = 20
+BASELINE_VERSION = 1
+REGRESSION_THRESHOLD = 0.10
+
+
+def new_game(game_class, rows: int, columns: int, winner_condition: str = '>'):
+    """Returns a game_class object set up at the standard starting position with black to move."""
+
+    game = game_class()
+    game.BOARD_SIZE = (rows, columns)
+    game.WINNER_CONDITION = winner_condition
+    game.whose_turn = 1
+    game.board_state = build_start_board(rows, columns)
+    return game
+
+
+def record_game(rows: int, columns: int, seed: int) -> [tuple]:
+    """Plays one game to the end choosing among the valid moves with a small linear congruential generator
+    seeded by seed. Returns the list of (row, column) moves played."""
+
+    game = new_game(BitboardOthelloGame, rows, columns)
+    state = seed
+    moves = []
+    while not game.is_game_over():
+        valid_moves = game.get_valid_moves()
+        state = (state * 1103515245 + 12345) % 2147483648
+        move = valid_moves[state % len(valid_moves)]
+        game.make_move(move)
+        moves.append(move)
+    return moves
+
+
+def replay_game(game_class, rows: int, columns: int, moves: [tuple]):
+    """Replays a recorded list of moves through a new game_class object the same way othello_ui does
+    (is_game_over before every move, then make_move). Returns the finished game."""
+
+    game = new_game(game_class, rows, columns)
+    for move in moves:
+        game.is_game_over()
+        game.make_move(move)
+    game.is_game_over()
+    return game
+
+
+def benchmark_engine(game_class, rows: int, columns: int, games: [[tuple]]) -> float:
+    """Replays every recorded game through game_class and returns the number of moves replayed per second."""
+
+    total_moves = sum(len(moves) for moves in games)
+    start = time.perf_counter()
+    for moves in games:
+        replay_game(game_class, rows, columns, moves)
+    return total_moves / (time.perf_counter() - start)
+
+
+def check_engines_agree(rows: int, columns: int, games: [[tuple]]) -> None:
+    """Replays every recorded game through both engines under both winner conditions and raises an
+    AssertionError if they disagree on the final board, piece counts, turn or winner."""
+
+    for moves in games:
+        list_game = replay_game(OthelloGame, rows, columns, moves)
+        bit_game = replay_game(BitboardOthelloGame, rows, columns, moves)
+        assert list_game.board_state == bit_game.board_state
+        assert tuple(list_game.get_piece_counts()) == tuple(bit_game.get_piece_counts())
+        assert list_game.whose_turn == bit_game.whose_turn
+        for winner_condition in ('>', '<'):
+            list_game.WINNER_CONDITION = winner_condition
+            bit_game.WINNER_CONDITION = winner_condition
+            assert list_game.get_winner() == bit_game.get_winner()
+
+
+def run_benchmark(games_per_size: int = GAMES_PER_SIZE) -> None:
+    """Records games_per_size games for every size in BENCHMARK_SIZES, checks that both engines agree on them
+    and prints the moves per second of each engine."""
+
+    print('{:>7}  {:>14}  {:>16}  {:>8}'.format('size', 'list moves/s', 'bitboard moves/s', 'speedup'))
+    for rows, columns in BENCHMARK_SIZES:
+        games = [record_game(rows, columns, seed) for seed in range(games_per_size)]
+        check_engines_agree(rows, columns, games)
+        list_rate = benchmark_engine(OthelloGame, rows, columns, games)
+        bit_rate = benchmark_engine(BitboardOthelloGame, rows, columns, games)
+        print('{:>7}  {:>14.0f}  {:>16.0f}  {:>7.1f}x'.format('{}x{}'.format(rows, columns),
+                                                             list_rate, bit_rate, bit_rate / list_rate))
+
+
+def build_suite_corpus(rows: int, columns: int, games: int = SUITE_GAMES, seed: int = SUITE_SEED) -> tuple:
+    """Records games games of the given size with seeds seed, seed + 1, ... Returns a (games, positions) tuple:
+    the recorded move lists and an OthelloGame copy of every position reached before a move, each paired with the
+    move played there. Every position has had is_game_over called, so its whose_turn is the player to move."""
+
+    recorded = [record_game(rows, columns, seed + number) for number in range(games)]
+    positions = []
+    for moves in recorded:
+        game = new_game(OthelloGame, rows, columns)
+        for move in moves:
+            game.is_game_over()
+            positions.append((othello_search.copy_game(game), move))
+            game.make_move(move)
+    return recorded, positions
+
+
+def time_suite_measure(measure: str, games: [[tuple]], positions: [tuple], rows: int, columns: int,
+                       winner_condition: str, repeats: int = SUITE_REPEATS) -> float:
+    """Times one measure of the suite once over the corpus of one board size. make_move is timed move by move
+    and taken back untimed; _get_flipped_pieces is called for every valid move of every position; the cheap
+    queries are called repeats times per position; replay plays every recorded game from the start as
+    othello_ui does and asks for the winner. Returns the number of operations (moves for replay) per second."""
+
+    operations = 0
+    elapsed = 0.0
+    if measure == 'replay':
+        start = time.perf_counter()
+        for moves in games:
+            game = new_game(OthelloGame, rows, columns, winner_condition)
+            for move in moves:
+                game.is_game_over()
+                game.make_move(move)
+            game.is_game_over()
+            game.get_winner()
+            operations += len(moves)
+        return operations / (time.perf_counter() - start)
+
+    for game, move in positions:
+        game.WINNER_CONDITION = winner_condition
+        if measure == 'make_move':
+            start = time.perf_counter()
+            game.make_move(move)
+            elapsed += time.perf_counter() - start
+            game.unmake_move()
+            operations += 1
+        elif measure == '_get_flipped_pieces':
+            valid_moves = game.get_valid_moves()
+            start = time.perf_counter()
+            for valid_move in valid_moves:
+                game._get_flipped_pieces(valid_move)
+            elapsed += time.perf_counter() - start
+            operations += len(valid_moves)
+        else:
+            function = getattr(game, measure)
+            start = time.perf_counter()
+            for repeat in range(repeats):
+                function()
+            elapsed += time.perf_counter() - start
+            operations += repeats
+    return operations / elapsed
+
+
+def run_suite(sizes: [tuple] = SUITE_SIZES, games: int = SUITE_GAMES, rounds: int = SUITE_ROUNDS,
+              seed: int = SUITE_SEED, write_line=print) -> {str: float}:
+    """Runs every suite measure for every size and winner condition rounds times and keeps the best rate of each,
+    so a run is less sensitive to a busy machine. Prints one line per result with write_line. Returns a
+    dictionary of result name ("8x8 > make_move") to operations per second."""
+
+    results = {}
+    write_line('{:>7} {:>3}  {:<20} {:>14}'.format('size', 'wc', 'measure', 'ops/s'))
+    for rows, columns in sizes:
+        recorded, positions = build_suite_corpus(rows, columns, games, seed)
+        for winner_condition in SUITE_WINNER_CONDITIONS:
+            for measure in SUITE_MEASURES:
+                rate = max(time_suite_measure(measure, recorded, positions, rows, columns, winner_condition)
+                           for round_number in range(rounds))
+                name = '{}x{} {} {}'.format(rows, columns, winner_condition, measure)
+                results[name] = rate
+                write_line('{:>7} {:>3}  {:<20} {:>14.0f}'.format('{}x{}'.format(rows, columns), winner_condition,
+                                                                  measure, rate))
+    return results
+
+
+def save_baseline(results: {str: float}, path: str, games: int = SUITE_GAMES, seed: int = SUITE_SEED) -> None:
+    """Writes suite results to path as a JSON baseline, with the corpus settings and the Python it ran on."""
+
+    baseline = {'version': BASELINE_VERSION, 'python': platform.python_version(), 'machine': platform.machine(),
+                'games': games, 'seed': seed, 'results': results}
+    with open(path, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+
+
+def load_baseline(path: str) -> dict:
+    """Reads a JSON baseline written by save_baseline. Raises a ValueError if it is not one."""
+
+    with open(path) as baseline_file:
+        baseline = json.load(baseline_file)
+    if not isinstance(baseline, dict) or baseline.get('version') != BASELINE_VERSION:
+        raise ValueError('{} is not an Othello benchmark baseline'.format(path))
+    return baseline
+
+
+def compare_results(baseline: {str: float}, results: {str: float},
+                    threshold: float = REGRESSION_THRESHOLD) -> [tuple]:
+    """Compares suite results with baseline results of the same names. Returns a list of (name, baseline rate,
+    new rate) tuples for every result more than threshold (a fraction) slower than its baseline."""
+
+    regressions = []
+    for name, rate in results.items():
+        if name in baseline and rate < baseline[name] * (1 - threshold):
+            regressions.append((name, baseline[name], rate))
+    return regressions
+
+
+def main() -> None:
+    """Runs the engine replay benchmark, or the microbenchmark suite with --suite, from the command line. When a
+    comparison finds regressions the exit status is 1."""
+
+    from othello_tournament import parse_size
+
+    parser = argparse.ArgumentParser(description='Benchmark the Othello Game engines.')
+    parser.add_argument('games', type=int, nargs='?', default=GAMES_PER_SIZE,
+                        help='games per size of the engine replay benchmark')
+    parser.add_argument('--suite', action='store_true', help='run the OthelloGame microbenchmark suite')
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=SUITE_SIZES)
+    parser.add_argument('--suite-games', type=int, default=SUITE_GAMES, help='recorded games per suite size')
+    parser.add_argument('--rounds', type=int, default=SUITE_ROUNDS, help='runs of each measure, best one kept')
+    parser.add_argument('--seed', type=int, default=SUITE_SEED)
+    parser.add_argument('--save', metavar='FILE', help='write the suite results to FILE as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='flag suite results slower than the baseline in FILE')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='fraction of the baseline rate a result may lose before it is a regression')
+    arguments = parser.parse_args()
+
+    if not (arguments.suite or arguments.save or arguments.compare):
+        run_benchmark(arguments.games)
+        return
+
+    baseline = load_baseline(arguments.compare) if arguments.compare else None
+    results = run_suite(arguments.sizes, arguments.suite_games, arguments.rounds, arguments.seed)
+    if arguments.save:
+        save_baseline(results, arguments.save, arguments.suite_games, arguments.seed)
+    if baseline is not None:
+        regressions = compare_results(baseline['results'], results, arguments.threshold)
+        for name, old_rate, new_rate in regressions:
+            print('REGRESSION {}: {:.0f} -> {:.0f} ops/s ({:+.1%})'.format(name, old_rate, new_rate,
+                                                                          new_rate / old_rate - 1))
+        print('{} of {} results regressed by more than {:.0%}'.format(len(regressions), len(results),
+                                                                     arguments.threshold))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
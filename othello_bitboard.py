@@ -0,0 +1,274 @@
+# othello_bitboard.py
+# This program is an alternative board representation for the Othello Game. Each color is stored as one packed
+# Python int (bit index = row * columns + column) and move generation and flips are done with shift-and-mask
+# operations instead of walking the board cell by cell. BitboardOthelloGame offers the same API as OthelloGame.
+
+from collections import namedtuple
+
+from othello_logic import InvalidBoardError, InvalidMoveError, InvalidFlipError, PieceCounts
+
+
+BoardMasks = namedtuple('BoardMasks', 'full not_first_column not_last_column directions')
+
+
+def _build_board_masks(rows: int, columns: int) -> BoardMasks:
+    """Builds the edge masks for a board of the given rows and columns. The directions field holds one
+    (shift, mask) pair for each of the eight directions: a positive shift moves bits towards higher indices
+    (left shift), a negative one towards lower indices, and the mask removes the bits that wrapped around a
+    board edge or fell off the end of the board."""
+
+    full = (1 << (rows * columns)) - 1
+    first_column = 0
+    for row in range(rows):
+        first_column |= 1 << (row * columns)
+    last_column = first_column << (columns - 1)
+    not_first_column = full & ~first_column
+    not_last_column = full & ~last_column
+
+    directions = ((1, not_first_column), (-1, not_last_column),
+                  (columns, full), (-columns, full),
+                  (columns + 1, not_first_column), (columns - 1, not_last_column),
+                  (-(columns - 1), not_first_column), (-(columns + 1), not_last_column))
+    return BoardMasks(full, not_first_column, not_last_column, directions)
+
+
+# Edge masks for every board size the game allows (even sizes from 4x4 to 16x16), built once at import.
+BOARD_MASKS = {(rows, columns): _build_board_masks(rows, columns)
+               for rows in range(4, 17, 2) for columns in range(4, 17, 2)}
+
+
+def _shift(bits: int, shift: int, mask: int) -> int:
+    """Shifts every bit of bits one square in the direction described by shift and masks off wrapped bits."""
+    if shift > 0:
+        return (bits << shift) & mask
+    return (bits >> -shift) & mask
+
+
+def _popcount(bits: int) -> int:
+    """Returns the number of set bits in bits."""
+    return bin(bits).count('1')
+
+
+def get_legal_moves_mask(own: int, opponent: int, masks: BoardMasks) -> int:
+    """Returns a bitboard of every empty square where the player owning own can move against opponent.
+    Floods each direction from the player's discs across runs of opponent discs; an empty square reached
+    right after such a run is a legal move."""
+
+    empty = masks.full & ~(own | opponent)
+    moves = 0
+    for shift, mask in masks.directions:
+        run = _shift(own, shift, mask) & opponent
+        while run:
+            run = _shift(run, shift, mask)
+            moves |= run & empty
+            run &= opponent
+    return moves
+
+
+def get_flips_mask(move: int, own: int, opponent: int, masks: BoardMasks) -> int:
+    """Returns a bitboard of the opponent discs that are flipped when the player owning own places a disc
+    on the single-bit square move. Returns 0 if the move flips nothing."""
+
+    flips = 0
+    for shift, mask in masks.directions:
+        line = 0
+        square = _shift(move, shift, mask)
+        while square & opponent:
+            line |= square
+            square = _shift(square, shift, mask)
+        if square & own:
+            flips |= line
+    return flips
+
+
+class BitboardOthelloGame:
+    """Othello Game backed by one packed integer bitboard per color. Offers the same public API as
+    othello_logic.OthelloGame (BOARD_SIZE, WINNER_CONDITION, whose_turn, board_state, make_move, is_game_over,
+    get_winner and get_piece_counts) so it can be swapped in wherever an OthelloGame is used."""
+
+    def __init__(self):
+        """Inititalizes all of the variables used in the BitboardOthelloGame object."""
+
+        self._EMPTY = 0
+        self._BLACK = 1
+        self._WHITE = -1
+        self.BOARD_SIZE = (0, 0)
+        self.WINNER_CONDITION = ''
+
+        self._rows = 0
+        self._columns = 0
+        self._masks = None
+        self._black = 0
+        self._white = 0
+        self.whose_turn = 0
+
+    @property
+    def board_state(self) -> [[int]]:
+        """Unpacks the bitboards into a list of lists of ints (0 empty, 1 black, -1 white) in the same form
+        as OthelloGame.board_state."""
+
+        board = []
+        bit = 1
+        for row in range(self._rows):
+            sublist = []
+            for column in range(self._columns):
+                if self._black & bit:
+                    sublist.append(self._BLACK)
+                elif self._white & bit:
+                    sublist.append(self._WHITE)
+                else:
+                    sublist.append(self._EMPTY)
+                bit <<= 1
+            board.append(sublist)
+        return board
+
+    @board_state.setter
+    def board_state(self, board: [[int]]) -> None:
+        """Packs a list of lists board_state into the black and white bitboards. Raises an InvalidBoardError
+        if the board is not a supported size or contains values other than 0, 1 and -1."""
+
+        rows = len(board)
+        columns = len(board[0]) if rows > 0 else 0
+        if any(len(row) != columns for row in board):
+            raise InvalidBoardError('The game_board is invalid. All rows must have the same length.')
+        if (rows, columns) not in BOARD_MASKS:
+            raise InvalidBoardError('Invalid Board Size: Must be even and between 4x4 and 16x16 in size')
+
+        black = 0
+        white = 0
+        bit = 1
+        for row in board:
+            for piece in row:
+                if piece == self._BLACK:
+                    black |= bit
+                elif piece == self._WHITE:
+                    white |= bit
+                elif piece != self._EMPTY:
+                    raise InvalidBoardError("The game_board is invalid. All pieces must be '.' 'B' or 'W'")
+                bit <<= 1
+
+        self._rows = rows
+        self._columns = columns
+        self._masks = BOARD_MASKS[(rows, columns)]
+        self._black = black
+        self._white = white
+
+    def make_move(self, coordinates: tuple):
+        """Takes in a set of coordinates (row, column) as a tuple. Attempts to make a move on that spot
+        and raises an InvalidMoveError if the move attempt is unsuccessful. Computes the flipped discs with
+        one shift-and-mask pass per direction and applies them to both bitboards at once.
+        Switches to the next player's turn at the end of the move."""
+
+        row, column = coordinates
+        if not (0 <= row < self._rows and 0 <= column < self._columns):
+            raise InvalidMoveError
+        move = 1 << (row * self._columns + column)
+        if (self._black | self._white) & move:
+            raise InvalidMoveError
+
+        own, opponent = self._own_and_opponent()
+        flips = get_flips_mask(move, own, opponent, self._masks)
+        if flips == 0:
+            raise InvalidMoveError
+
+        own |= move | flips
+        opponent &= ~flips
+        self._set_own_and_opponent(own, opponent)
+        self._switch_turns()
+
+    def is_game_over(self) -> bool:
+        """Checks the game board and other othello game-states to find out if the game is over or not.
+        Behaves exactly like OthelloGame.is_game_over: if the current player has no valid moves the turn
+        switches to the next player, and the game is over if neither player can move or the board is full."""
+
+        if self.get_piece_counts().empty == 0:
+            return True
+        if not self._is_any_valid_moves():
+            self._switch_turns()
+            if not self._is_any_valid_moves():
+                return True
+        return False
+
+    def get_winner(self) -> int or None:
+        """Returns the winner of the othello game under the WINNER_CONDITION ('>' most discs wins,
+        '<' fewest discs wins) or None if the players are tied."""
+
+        black = _popcount(self._black)
+        white = _popcount(self._white)
+        if black == white:
+            return None
+        if (black > white) == (self.WINNER_CONDITION == '>'):
+            return self._BLACK
+        return self._WHITE
+
+    def get_piece_counts(self) -> PieceCounts:
+        """Counts the set bits of each bitboard. Returns a PieceCounts namedtuple containing .empty .black and
+        .white instances in the same form as OthelloGame.get_piece_counts."""
+
+        black = _popcount(self._black)
+        white = _popcount(self._white)
+        return PieceCounts(self._rows * self._columns - black - white, black, white)
+
+    def get_valid_moves(self) -> [tuple]:
+        """Returns a list of (row, column) tuples of every valid move for the current player in board order."""
+
+        own, opponent = self._own_and_opponent()
+        moves = get_legal_moves_mask(own, opponent, self._masks)
+        valid_moves = []
+        while moves:
+            bit = moves & -moves
+            index = bit.bit_length() - 1
+            valid_moves.append((index // self._columns, index % self._columns))
+            moves ^= bit
+        return valid_moves
+
+    # PRIVATE FUNCTIONS #
+
+    def _get_flipped_pieces(self, coordinates: tuple) -> [tuple]:
+        """Takes in a tuple set of coordinates (row, column) and returns a list of tuples: coordinates of pieces
+        which would be flipped if the current player placed a piece on the coordinates passed."""
+
+        move = 1 << (coordinates[0] * self._columns + coordinates[1])
+        own, opponent = self._own_and_opponent()
+        flips = get_flips_mask(move, own, opponent, self._masks)
+        flipped = []
+        while flips:
+            bit = flips & -flips
+            index = bit.bit_length() - 1
+            flipped.append((index // self._columns, index % self._columns))
+            flips ^= bit
+        return flipped
+
+    def _is_any_valid_moves(self) -> bool:
+        """Returns True if the current player has at least one valid move, otherwise returns False."""
+
+        own, opponent = self._own_and_opponent()
+        return get_legal_moves_mask(own, opponent, self._masks) != 0
+
+    def _switch_turns(self):
+        """Switches to the next player's turn by multiplying self.whose_turn by -1 """
+        self.whose_turn *= -1
+
+    def _flip_piece(self, coordinates: tuple):
+        """Takes in a coordinates tuple (row, column) and flips the piece at that coordinate to the other
+        color. Raises an InvalidFlipError if the coordinates passed are to an empty space."""
+
+        bit = 1 << (coordinates[0] * self._columns + coordinates[1])
+        if not (self._black | self._white) & bit:
+            raise InvalidFlipError
+        self._black ^= bit
+        self._white ^= bit
+
+    def _own_and_opponent(self) -> tuple:
+        """Returns a (own, opponent) tuple of bitboards from the point of view of the current player."""
+        if self.whose_turn == self._BLACK:
+            return self._black, self._white
+        return self._white, self._black
+
+    def _set_own_and_opponent(self, own: int, opponent: int) -> None:
+        """Stores the (own, opponent) bitboards back from the point of view of the current player."""
+        if self.whose_turn == self._BLACK:
+            self._black, self._white = own, opponent
+        else:
+            self._white, self._black = own, opponent
+
@@ -0,0 +1,183 @@
+# othello_book.py
+# This program builds and reads the opening book of the Othello Game. The book is built by playing self-play games
+# from the center-four starting layouts and searching each position of the first plies once. Positions are keyed by
+# their othello_symmetry canonical key (8 symmetries for square boards, 4 for rectangular ones), so a position
+# and its rotations and reflections share one entry. The book file is a sorted array of fixed-size
+# entries that is memory-mapped on the first lookup and searched with a binary search.
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+from collections import namedtuple
+
+from othello_logic import OthelloGame, START_LAYOUTS, build_start_board
+from othello_symmetry import get_canonical_key, transform_square, untransform_square
+import othello_search
+
+
+BookEntry = namedtuple('BookEntry', 'move score')
+
+BOOK_MAGIC = b'OTHBOOK\x01'
+BOOK_HEADER = struct.Struct('<8sQ')
+BOOK_ENTRY = struct.Struct('<QBxh')
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'othello_book.bin')
+DEFAULT_BOOK_PLIES = 10
+DEFAULT_BOOK_DEPTH = 4
+DEFAULT_EXPLORE_RATE = 0.3
+
+_default_book = None
+
+
+class OpeningBook:
+    """Read-only opening book file. Nothing is read when the book is created: the file is memory-mapped on the
+    first lookup, and each lookup is a binary search over the sorted entries."""
+
+    def __init__(self, path: str):
+        """Initializes the book for the file at path without opening it."""
+
+        self.path = path
+        self._file = None
+        self._map = None
+        self._entries = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, game: OthelloGame) -> BookEntry or None:
+        """Returns the BookEntry (move in game's coordinates and search score) stored for the position in game,
+        or None if the position is not in the book or its move is not valid there."""
+
+        if self._map is None:
+            self._open()
+        key, transform = get_canonical_key(game)
+        low = 0
+        high = self._entries
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, move, score = BOOK_ENTRY.unpack_from(self._map, BOOK_HEADER.size + middle * BOOK_ENTRY.size)
+            if entry_key < key:
+                low = middle + 1
+            elif entry_key > key:
+                high = middle
+            else:
+                rows, columns = game.BOARD_SIZE
+                move = untransform_square(transform, (move >> 4, move & 15), rows, columns)
+                if game.is_legal_move(move):
+                    self.hits += 1
+                    return BookEntry(move, score)
+                break
+        self.misses += 1
+        return None
+
+    def __len__(self) -> int:
+        """Returns the number of positions in the book."""
+
+        if self._map is None:
+            self._open()
+        return self._entries
+
+    def close(self) -> None:
+        """Unmaps the book file. It is mapped again by the next lookup."""
+
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def _open(self) -> None:
+        """Memory-maps the book file and reads its header. Raises a ValueError if it is not a book file."""
+
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._entries = BOOK_HEADER.unpack_from(self._map, 0)
+        if magic != BOOK_MAGIC or len(self._map) != BOOK_HEADER.size + self._entries * BOOK_ENTRY.size:
+            self.close()
+            raise ValueError('{} is not an Othello opening book'.format(self.path))
+
+
+def get_default_book() -> OpeningBook or None:
+    """Returns the OpeningBook at DEFAULT_BOOK_PATH, shared by every caller, or None if no book has been built."""
+
+    global _default_book
+    if _default_book is None and os.path.exists(DEFAULT_BOOK_PATH):
+        _default_book = OpeningBook(DEFAULT_BOOK_PATH)
+    return _default_book
+
+
+def build_book(sizes: [tuple], layouts: [str], winner_conditions: [str], games: int,
+               plies: int = DEFAULT_BOOK_PLIES, search_depth: int = DEFAULT_BOOK_DEPTH, seed: int = 0,
+               explore_rate: float = DEFAULT_EXPLORE_RATE) -> {int: BookEntry}:
+    """Plays games self-play games for every size, layout, winner condition and first player, up to plies moves
+    each. Every position reached that is not yet in the book is searched to search_depth and its best move is
+    stored. The game then plays the book move, or with probability explore_rate a random valid move so the book
+    covers more than one line. Returns a dictionary of book key to BookEntry (in canonical coordinates)."""
+
+    rng = random.Random(seed)
+    engine = othello_search.SearchEngine(time_budget=float('inf'), max_depth=search_depth)
+    entries = {}
+    for rows, columns in sizes:
+        for layout in layouts:
+            for winner_condition in winner_conditions:
+                for first_player in (1, -1):
+                    for game_number in range(games):
+                        game = OthelloGame()
+                        game.BOARD_SIZE = (rows, columns)
+                        game.WINNER_CONDITION = winner_condition
+                        game.whose_turn = first_player
+                        game.board_state = build_start_board(rows, columns, layout)
+                        for ply in range(plies):
+                            if game.is_game_over():
+                                break
+                            key, transform = get_canonical_key(game)
+                            if key not in entries:
+                                result = engine.find_best_move(game)
+                                entries[key] = BookEntry(transform_square(transform, result.move, rows, columns),
+                                                         max(-32768, min(32767, result.score)))
+                                move = result.move
+                            else:
+                                move = untransform_square(transform, entries[key].move, rows, columns)
+                            if rng.random() < explore_rate:
+                                move = rng.choice(game.get_valid_moves())
+                            game.make_move(move)
+    return entries
+
+
+def write_book(entries: {int: BookEntry}, path: str) -> None:
+    """Writes the book entries to path sorted by key, ready for OpeningBook to memory-map."""
+
+    with open(path, 'wb') as book_file:
+        book_file.write(BOOK_HEADER.pack(BOOK_MAGIC, len(entries)))
+        for key in sorted(entries):
+            move, score = entries[key]
+            book_file.write(BOOK_ENTRY.pack(key, (move[0] << 4) | move[1], score))
+
+
+def main() -> None:
+    """Builds an opening book from the command line."""
+
+    from othello_tournament import parse_size
+
+    parser = argparse.ArgumentParser(description='Build the Othello opening book from self-play games.')
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=[(8, 8)])
+    parser.add_argument('--layouts', nargs='+', choices=START_LAYOUTS, default=list(START_LAYOUTS))
+    parser.add_argument('--winner-conditions', nargs='+', choices=['>', '<'], default=['>', '<'])
+    parser.add_argument('--games', type=int, default=50, help='games per size, layout, condition and first player')
+    parser.add_argument('--plies', type=int, default=DEFAULT_BOOK_PLIES, help='moves of each game kept in the book')
+    parser.add_argument('--search-depth', type=int, default=DEFAULT_BOOK_DEPTH)
+    parser.add_argument('--explore-rate', type=float, default=DEFAULT_EXPLORE_RATE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_BOOK_PATH)
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    entries = build_book(arguments.sizes, arguments.layouts, arguments.winner_conditions, arguments.games,
+                         arguments.plies, arguments.search_depth, arguments.seed, arguments.explore_rate)
+    write_book(entries, arguments.output)
+    print('{} positions written to {} in {:.1f}s'.format(len(entries), arguments.output,
+                                                         time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
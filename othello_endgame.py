@@ -0,0 +1,272 @@
+# othello_endgame.py
+# This program solves Othello endgames exactly. Once few enough squares are empty the game tree can be searched to
+# the end: the solver returns the final disc differential under perfect play and the move that reaches it, for
+# either winner condition. It works on packed bitboards (see othello_bitboard), orders moves by region parity,
+# has dedicated code for the last one and two empty squares, and passes the turn exactly like is_game_over.
+# Run as a script it benchmarks solve time against the number of empty squares on 8x8 and 10x10 boards.
+
+import argparse
+import random
+import time
+from collections import namedtuple
+
+from othello_logic import OthelloGame, InvalidBoardError, build_start_board
+from othello_bitboard import BOARD_MASKS, get_flips_mask, get_legal_moves_mask
+import othello_search
+
+
+EndgameResult = namedtuple('EndgameResult', 'move differential nodes elapsed')
+
+BENCHMARK_SIZES = [(8, 8), (10, 10)]
+BENCHMARK_EMPTIES = [4, 6, 8, 10, 12]
+BENCHMARK_POSITIONS = 5
+FASTEST_FIRST_EMPTIES = 7
+MAX_POSITION_ATTEMPTS = 1000
+
+_INFINITY = 1 << 20
+
+
+def _count_bits(bits: int) -> int:
+    """Returns the number of set bits in bits."""
+    return bin(bits).count('1')
+
+
+class EndgameSolver:
+    """Exact endgame search. solve() searches an OthelloGame position to the end of the game with negamax
+    alpha-beta over bitboards. With FASTEST_FIRST_EMPTIES or more empty squares, moves that leave the opponent
+    the fewest replies are tried first; nearer the end, moves in regions (board quadrants) with an odd number of
+    empty squares are tried first, then by square priority. A player with no valid moves passes; the game ends
+    when neither player can move or the board is full, as in OthelloGame.is_game_over."""
+
+    def __init__(self):
+        """Initializes the solver. Board data is set up by each call to solve."""
+
+        self.nodes = 0
+        self._masks = None
+        self._regions = {}
+        self._sign = 1
+
+    def solve(self, game: OthelloGame) -> EndgameResult:
+        """Solves the position in game for the player whose_turn it is. Returns an EndgameResult of the best move
+        (None if the player has to pass), the final number of that player's discs minus the opponent's under
+        perfect play by both sides for the game's WINNER_CONDITION, the number of nodes searched and the time
+        taken. Raises an InvalidBoardError for a board size othello_bitboard does not support."""
+
+        start = time.perf_counter()
+        rows, columns = game.BOARD_SIZE
+        if (rows, columns) not in BOARD_MASKS:
+            raise InvalidBoardError('Invalid Board Size: Must be even and between 4x4 and 16x16 in size')
+        self._masks = BOARD_MASKS[(rows, columns)]
+        self._sign = 1 if game.WINNER_CONDITION == '>' else -1
+        self.nodes = 0
+
+        own = 0
+        opponent = 0
+        empties = []
+        priorities = othello_search.get_square_priorities(rows, columns)
+        self._regions = {}
+        parity = 0
+        for row in range(rows):
+            for column in range(columns):
+                bit = 1 << (row * columns + column)
+                piece = game.board_state[row][column]
+                if piece == game.whose_turn:
+                    own |= bit
+                elif piece == -game.whose_turn:
+                    opponent |= bit
+                else:
+                    empties.append((priorities[(row, column)], bit))
+                    region = 1 << ((2 * row) // rows * 2 + (2 * column) // columns)
+                    self._regions[bit] = region
+                    parity ^= region
+        empties = [bit for priority, bit in sorted(empties)]
+        difference = _count_bits(own) - _count_bits(opponent)
+
+        best_move = None
+        best_score = -_INFINITY
+        alpha = -_INFINITY
+        for move, flips in self._get_moves(own, opponent, empties, parity):
+            flipped = _count_bits(flips)
+            score = -self._negamax(opponent & ~flips, own | move | flips, [bit for bit in empties if bit != move],
+                                   parity ^ self._regions[move], -(difference + 1 + 2 * flipped),
+                                   -_INFINITY, -alpha, False)
+            if score > best_score:
+                best_score = score
+                best_move = move
+                alpha = max(alpha, score)
+        if best_move is None:
+            best_score = self._negamax(own, opponent, empties, parity, difference, -_INFINITY, _INFINITY, False)
+        else:
+            index = best_move.bit_length() - 1
+            best_move = (index // columns, index % columns)
+
+        return EndgameResult(best_move, best_score * self._sign, self.nodes, time.perf_counter() - start)
+
+    # PRIVATE FUNCTIONS #
+
+    def _get_moves(self, own: int, opponent: int, empties: [int], parity: int) -> [tuple]:
+        """Returns (move bit, flips bitboard) pairs for every valid move of own among the empty squares. Far from
+        the end they are ordered by the number of replies left to the opponent, fewest first; otherwise the ones
+        in regions with an odd number of empty squares come first."""
+
+        odd_moves = []
+        even_moves = []
+        masks = self._masks
+        for move in empties:
+            flips = get_flips_mask(move, own, opponent, masks)
+            if flips:
+                if parity & self._regions[move]:
+                    odd_moves.append((move, flips))
+                else:
+                    even_moves.append((move, flips))
+        moves = odd_moves + even_moves
+        if len(empties) >= FASTEST_FIRST_EMPTIES and len(moves) > 1:
+            moves.sort(key=lambda pair: _count_bits(get_legal_moves_mask(opponent & ~pair[1],
+                                                                         own | pair[0] | pair[1], masks)))
+        return moves
+
+    def _negamax(self, own: int, opponent: int, empties: [int], parity: int, difference: int, alpha: int,
+                 beta: int, passed: bool) -> int:
+        """Returns the exact score of the position for the player owning own: their final disc difference,
+        negated under the '<' winner condition. difference is their current disc difference."""
+
+        self.nodes += 1
+        if len(empties) == 0:
+            return difference * self._sign
+        if len(empties) == 1:
+            return self._solve_one(own, opponent, empties[0], difference)
+        if len(empties) == 2:
+            return self._solve_two(own, opponent, empties[0], empties[1], difference, alpha, beta)
+
+        best_score = -_INFINITY
+        for move, flips in self._get_moves(own, opponent, empties, parity):
+            flipped = _count_bits(flips)
+            score = -self._negamax(opponent & ~flips, own | move | flips, [bit for bit in empties if bit != move],
+                                   parity ^ self._regions[move], -(difference + 1 + 2 * flipped),
+                                   -beta, -max(alpha, best_score), False)
+            if score > best_score:
+                best_score = score
+                if best_score >= beta:
+                    return best_score
+
+        if best_score == -_INFINITY:
+            if passed:
+                return difference * self._sign
+            return -self._negamax(opponent, own, empties, parity, -difference, -beta, -alpha, True)
+        return best_score
+
+    def _solve_one(self, own: int, opponent: int, square: int, difference: int) -> int:
+        """Returns the exact score with one empty square left: the player to move takes it if they can, the
+        opponent takes it if only they can, and otherwise it stays empty."""
+
+        self.nodes += 1
+        flips = get_flips_mask(square, own, opponent, self._masks)
+        if flips:
+            return (difference + 1 + 2 * _count_bits(flips)) * self._sign
+        flips = get_flips_mask(square, opponent, own, self._masks)
+        if flips:
+            return (difference - 1 - 2 * _count_bits(flips)) * self._sign
+        return difference * self._sign
+
+    def _solve_two(self, own: int, opponent: int, first: int, second: int, difference: int, alpha: int,
+                   beta: int) -> int:
+        """Returns the exact score with two empty squares left, trying each square for the player to move and
+        then, if they must pass, for the opponent. The game ends if neither can move."""
+
+        self.nodes += 1
+        masks = self._masks
+        best_score = -_INFINITY
+        for move, other in ((first, second), (second, first)):
+            flips = get_flips_mask(move, own, opponent, masks)
+            if flips:
+                score = -self._solve_one(opponent & ~flips, own | move | flips, other,
+                                         -(difference + 1 + 2 * _count_bits(flips)))
+                if score > best_score:
+                    best_score = score
+                    if best_score >= beta:
+                        return best_score
+        if best_score != -_INFINITY:
+            return best_score
+
+        for move, other in ((first, second), (second, first)):
+            flips = get_flips_mask(move, opponent, own, masks)
+            if flips:
+                score = self._solve_one(own & ~flips, opponent | move | flips, other,
+                                        difference - 1 - 2 * _count_bits(flips))
+                if best_score == -_INFINITY or score < best_score:
+                    best_score = score
+                    if best_score <= alpha:
+                        return best_score
+        if best_score != -_INFINITY:
+            return best_score
+        return difference * self._sign
+
+
+def build_endgame_position(rows: int, columns: int, empties: int, rng: random.Random) -> OthelloGame:
+    """Plays random moves from the standard starting position until only empties squares are left and the player
+    to move has a valid move. Starts again if the game ends first. Returns the game. Raises a ValueError if
+    empties is not between 1 and rows * columns - 4, or if no such position turns up in MAX_POSITION_ATTEMPTS
+    games."""
+
+    if not 1 <= empties <= rows * columns - 4:
+        raise ValueError('empties must be between 1 and {} on a {}x{} board'.format(rows * columns - 4, rows,
+                                                                                   columns))
+    for attempt in range(MAX_POSITION_ATTEMPTS):
+        game = OthelloGame()
+        game.BOARD_SIZE = (rows, columns)
+        game.WINNER_CONDITION = '>'
+        game.whose_turn = 1
+        game.board_state = build_start_board(rows, columns)
+        while not game.is_game_over():
+            if game.get_piece_counts().empty == empties:
+                return game
+            game.make_move(rng.choice(game.get_valid_moves()))
+    raise ValueError('no position with {} empty squares and a move to play was reached on a {}x{} board in {} '
+                     'games'.format(empties, rows, columns, MAX_POSITION_ATTEMPTS))
+
+
+def run_benchmark(sizes: [tuple] = BENCHMARK_SIZES, empties_counts: [int] = BENCHMARK_EMPTIES,
+                  positions: int = BENCHMARK_POSITIONS, seed: int = 0) -> None:
+    """Solves positions random positions for each board size and number of empty squares under both winner
+    conditions and prints the mean nodes and solve time."""
+
+    rng = random.Random(seed)
+    solver = EndgameSolver()
+    print('{:>7} {:>8} {:>3} {:>12} {:>12} {:>12}'.format('size', 'empties', 'wc', 'nodes', 'ms/solve', 'knodes/s'))
+    for rows, columns in sizes:
+        for empties in empties_counts:
+            games = [build_endgame_position(rows, columns, empties, rng) for position in range(positions)]
+            for winner_condition in ('>', '<'):
+                nodes = 0
+                elapsed = 0.0
+                for game in games:
+                    game.WINNER_CONDITION = winner_condition
+                    result = solver.solve(game)
+                    nodes += result.nodes
+                    elapsed += result.elapsed
+                print('{:>7} {:>8} {:>3} {:>12.0f} {:>12.2f} {:>12.1f}'.format(
+                    '{}x{}'.format(rows, columns), empties, winner_condition, nodes / positions,
+                    elapsed / positions * 1000, nodes / elapsed / 1000))
+
+
+def main() -> None:
+    """Runs the endgame benchmark with the sizes and empty square counts given on the command line."""
+
+    from othello_tournament import parse_size
+
+    parser = argparse.ArgumentParser(description='Benchmark the exact Othello endgame solver.')
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=BENCHMARK_SIZES)
+    parser.add_argument('--empties', type=int, nargs='+', default=BENCHMARK_EMPTIES)
+    parser.add_argument('--positions', type=int, default=BENCHMARK_POSITIONS)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    for rows, columns in arguments.sizes:
+        for empties in arguments.empties:
+            if not 1 <= empties <= rows * columns - 4:
+                parser.error('--empties must be between 1 and {} for {}x{} boards'.format(rows * columns - 4, rows,
+                                                                                        columns))
+    run_benchmark(arguments.sizes, arguments.empties, arguments.positions, arguments.seed)
+
+
+if __name__ == '__main__':
+    main()
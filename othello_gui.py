@@ -4,24 +4,221 @@
 # This program controls Tkinter interfaces for the Graphical User Interface (GUI) version of the Othello Game.
 
 
+import queue
+import threading
 import tkinter
+from collections import namedtuple
 from othello_logic import OthelloGame
 import othello_logic
+import othello_profile
+import othello_replay
+import othello_search
+import othello_server
 
 BACKGROUND_COLOR = '#dde2d5'
 DEFAULT_FONT = ('Helvetica', 14)
 BOARD_COLOR = '#0c5e1b'
+HINT_COLOR = '#f2d649'
+BOARD_RATIO1 = (0.05, 0.05)
+BOARD_RATIO2 = (0.95, 0.95)
+RESIZE_DEBOUNCE_MS = 100
+ENGINE_POLL_MS = 15
+
+EngineRequest = namedtuple('EngineRequest', 'function args callback stop clear_stop cancelled')
+
+
+class BoardGeometry:
+    """Pixel layout of a board of rows x columns squares drawn on a canvas: the pixel origin (top left corner) of
+    the board and the pixel size of one square. Maps a click to its square and a square to its box with
+    arithmetic, so neither window keeps or scans a list of every box."""
+    def __init__(self, rows: int, columns: int):
+        """Initializes the layout of a board with the given number of rows and columns on an empty canvas."""
+        self.rows = rows
+        self.columns = columns
+        self.canvas_size = (0, 0)
+        self.origin = (0.0, 0.0)
+        self.cell_size = (0.0, 0.0)
+
+    def resize(self, width: int, height: int) -> bool:
+        """Lays the board out between the BOARD_RATIO1 and BOARD_RATIO2 fractions of a width x height pixel
+        canvas. Returns False if the canvas already had that size (nothing changed), True otherwise."""
+        if (width, height) == self.canvas_size:
+            return False
+        self.canvas_size = (width, height)
+        self.origin = (BOARD_RATIO1[0] * width, BOARD_RATIO1[1] * height)
+        self.cell_size = ((BOARD_RATIO2[0] - BOARD_RATIO1[0]) * width / self.columns,
+                          (BOARD_RATIO2[1] - BOARD_RATIO1[1]) * height / self.rows)
+        return True
+
+    def get_square(self, x: float, y: float) -> tuple or None:
+        """Takes in the pixel coordinates of a point and returns the (row, column) of the square it falls in,
+        or None if it is outside the board."""
+        if self.cell_size[0] <= 0 or self.cell_size[1] <= 0:
+            return None
+        column = int((x - self.origin[0]) // self.cell_size[0])
+        row = int((y - self.origin[1]) // self.cell_size[1])
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return row, column
+        return None
+
+    def get_box(self, row: int, column: int) -> tuple:
+        """Takes in a (row, column) square and returns its box as ((left, top), (right, bottom)) pixel
+        coordinates."""
+        left = self.origin[0] + self.cell_size[0] * column
+        top = self.origin[1] + self.cell_size[1] * row
+        return (left, top), (left + self.cell_size[0], top + self.cell_size[1])
+
+    def get_squares(self) -> [tuple]:
+        """Returns every (row, column) square of the board in row order."""
+        return [(row, column) for row in range(self.rows) for column in range(self.columns)]
+
+
+class ResizeDebouncer:
+    """Coalesces the burst of <Configure> events a window drag fires into a single call of on_resize(width, height),
+    made interval milliseconds after the last event of the burst with tkinter after. The first size is passed on
+    at once and events that leave the size unchanged are dropped. Counts the redraws made and suppressed."""
+    def __init__(self, widget: tkinter.Widget, on_resize, interval: int = RESIZE_DEBOUNCE_MS):
+        """Initializes the debouncer for the <Configure> events of widget."""
+        self._widget = widget
+        self._on_resize = on_resize
+        self.interval = interval
+        self._size = None
+        self._pending = None
+        self.redraws = 0
+        self.suppressed_redraws = 0
+
+    def on_configure(self, event: tkinter.Event) -> None:
+        """Bound to <Configure>. Cancels the redraw scheduled by the previous event of a burst, if any, and
+        schedules one for the new size unless the board is already drawn at that size. Each event counts as at
+        most one suppressed redraw."""
+        size = (event.width, event.height)
+        suppressed = self._pending is not None
+        if suppressed:
+            self._widget.after_cancel(self._pending)
+            self._pending = None
+        if size == self._size:
+            suppressed = True
+        elif self._size is None:
+            self._resize(size)
+        else:
+            self._pending = self._widget.after(self.interval, self._resize, size)
+        if suppressed:
+            self.suppressed_redraws += 1
+
+    def _resize(self, size: tuple) -> None:
+        """Calls on_resize with the settled size of the widget."""
+        self._pending = None
+        self._size = size
+        self.redraws += 1
+        self._on_resize(size[0], size[1])
+
+
+class EngineWorker:
+    """Runs slow engine work (searches, analysis) on a background thread so the tkinter main loop keeps handling
+    input and repainting. Requests are queued to the worker thread and results come back through a second queue
+    that is polled with tkinter after, so every callback runs on the main thread. Cancelled requests are skipped
+    if they have not started, interrupted through their stop function if they have, and their results dropped.
+    A request's clear_stop function is called on the worker thread just before it starts, then the request is
+    checked for a cancel again, so a stop can never be lost between the two."""
+    def __init__(self, widget: tkinter.Widget, poll_interval: int = ENGINE_POLL_MS):
+        """Starts the worker thread. Results are polled for every poll_interval milliseconds on widget's loop
+        while requests are outstanding."""
+        self._widget = widget
+        self.poll_interval = poll_interval
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._live_requests = []
+        self._poll_pending = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, function, args: tuple, callback, stop=None, clear_stop=None) -> None:
+        """Queues a call of function(*args) on the worker thread. callback(result) is called on the main thread
+        when it finishes, unless the request is cancelled first. stop, if given, is called on cancel to interrupt
+        function while it runs, and clear_stop on the worker thread to undo earlier stops before it starts."""
+        request = EngineRequest(function, args, callback, stop, clear_stop, threading.Event())
+        self._live_requests.append(request)
+        self._requests.put(request)
+        if self._poll_pending is None:
+            self._poll_pending = self._widget.after(self.poll_interval, self._poll)
+
+    def cancel_all(self) -> None:
+        """Cancels every outstanding request, called when the position they were asked about changes."""
+        for request in self._live_requests:
+            request.cancelled.set()
+            if request.stop is not None:
+                request.stop()
+        self._live_requests = []
+
+    def is_busy(self) -> bool:
+        """Returns True if a request is waiting for or running on the worker thread."""
+        return len(self._live_requests) > 0
+
+    def close(self) -> None:
+        """Cancels outstanding requests and ends the worker thread."""
+        self.cancel_all()
+        self._requests.put(None)
+
+    def _run(self) -> None:
+        """Worker thread loop: runs each request that has not been cancelled and queues its result, or the
+        exception it raised so it can be raised again on the main thread."""
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            if request.cancelled.is_set():
+                continue
+            if request.clear_stop is not None:
+                request.clear_stop()
+                if request.cancelled.is_set():
+                    continue
+            try:
+                self._results.put((request, request.function(*request.args), None))
+            except Exception as error:
+                self._results.put((request, None, error))
+
+    def _poll(self) -> None:
+        """Hands finished results of live requests to their callbacks, then polls again while requests are
+        outstanding."""
+        self._poll_pending = None
+        while True:
+            try:
+                request, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if request.cancelled.is_set():
+                continue
+            self._live_requests.remove(request)
+            if error is not None:
+                raise error
+            request.callback(result)
+        if self.is_busy() and self._poll_pending is None:
+            self._poll_pending = self._widget.after(self.poll_interval, self._poll)
 
 
 class MainGameGui:
     """Last Class run in the game. Controls interfacing with the OthelloGame class and runs each player's turn.
     This is the primary game Gui which the user will use for playing the Othello Game."""
-    def __init__(self):
-        """Initializes the tkinter self._root_window and attributes (buttons, labels, etc)."""
+    def __init__(self, computer_player: int = None, time_budget: float = othello_search.DEFAULT_TIME_BUDGET,
+                 resize_interval: int = RESIZE_DEBOUNCE_MS, show_hints: bool = False):
+        """Initializes the tkinter self._root_window and attributes (buttons, labels, etc).
+        If computer_player is 1 (black) or -1 (white) that player's moves are made by the search engine,
+        which gets time_budget seconds per move on a background EngineWorker thread (the engine of the
+        othello_server at OTHELLO_SERVER if one is running). Window resizes are redrawn resize_interval
+        milliseconds after the last <Configure> event of a burst. With show_hints every legal move of the human
+        player to move is marked with the number of discs it flips."""
         self._root_window = tkinter.Tk()
-        self._width = 600
-        self._height = 600
-        self._boxes_coordinates_list = [[]]
+        self._geometry = BoardGeometry(othello_game.BOARD_SIZE[0], othello_game.BOARD_SIZE[1])
+        self._square_items = {}
+        self._hint_items = {}
+        self._hinted_squares = set()
+        self._legal_moves = {}
+        self._legal_moves_key = None
+        self._computer_player = computer_player
+        self._search_engine = othello_server.get_search_engine(time_budget)
+        self._replay = othello_replay.GameReplay.from_game(othello_game)
+        self._ply = 0
+        self._stats_dumped = False
         ###############
         self._piece_count_label = tkinter.Label(master=self._root_window, text='', font=("Helvetica", 17))
 
@@ -37,8 +234,26 @@ class MainGameGui:
                                                text='', font=("Helvetica", 17))
         self._whose_turn_label.grid(row=2, column=0, padx=10, pady=10, sticky=tkinter.N)
         ################
+        history_frame = tkinter.Frame(master=self._root_window)
+        history_frame.grid(row=3, column=0, padx=10, pady=10, sticky=tkinter.S)
+        undo_button = tkinter.Button(master=history_frame, text='Undo', font=DEFAULT_FONT,
+                                     command=self._on_undo_button)
+        undo_button.grid(row=0, column=0, padx=10, pady=10)
+        redo_button = tkinter.Button(master=history_frame, text='Redo', font=DEFAULT_FONT,
+                                     command=self._on_redo_button)
+        redo_button.grid(row=0, column=1, padx=10, pady=10)
+        self._show_hints = tkinter.BooleanVar(master=self._root_window, value=show_hints)
+        hints_button = tkinter.Checkbutton(master=history_frame, text='Show Moves', font=DEFAULT_FONT,
+                                           variable=self._show_hints, command=self._on_hints_toggled)
+        hints_button.grid(row=0, column=2, padx=10, pady=10)
+        self._scrubber = tkinter.Scale(master=history_frame, from_=0, to=0, orient=tkinter.HORIZONTAL,
+                                       label='Move', font=DEFAULT_FONT, command=self._on_scrubbed)
+        self._scrubber.grid(row=1, column=0, columnspan=3, padx=10, sticky=tkinter.E + tkinter.W)
+        ################
         self._canvas.bind('<Button-1>', self._on_canvas_clicked)
-        self._canvas.bind('<Configure>', self._on_canvas_resized)
+        self._resize_debouncer = ResizeDebouncer(self._canvas, self._on_canvas_resized, resize_interval)
+        self._canvas.bind('<Configure>', self._resize_debouncer.on_configure)
+        self._engine_worker = EngineWorker(self._root_window)
 
         self._root_window.rowconfigure(0, weight=1)
         self._root_window.rowconfigure(1, weight=1)
@@ -46,107 +261,229 @@ class MainGameGui:
         self._root_window.columnconfigure(0, weight=1)
 
     def run(self) -> None:
-        """Runs the mainloop on the root window for the tkinter interface."""
+        """Runs the mainloop on the root window for the tkinter interface. The profiling stats are written when
+        the window closes if the game did not end."""
         self._root_window.mainloop()
+        self._engine_worker.close()
+        self._dump_stats()
 
-    def _draw_board(self) -> None:
-        """Prints the main background board with colors and updates sizes.
-        Prints the OthelloGame board_state to the gui with corresponding blanks, blacks, and whites."""
+    def _draw_board(self, changed_squares: [tuple] = None) -> None:
+        """Updates the piece count and turn labels and recolors the discs of changed_squares (every square if None)
+        to match the OthelloGame board_state. The square and disc items are created once, the first time the board
+        is drawn, and are only recolored afterwards, so a move costs the squares it placed and flipped."""
         color_converter = {-1: 'White', 1: 'Black', None: 'TIE'}
         piece_counts = othello_game.get_piece_counts()
-        if othello_game.is_game_over():
+        game_over = othello_game.is_game_over()
+        if game_over:
             winning_color = color_converter[othello_game.get_winner()]
             self._whose_turn_label.configure(text="GAME OVER\n{} Wins!".format(winning_color))
+            self._dump_stats()
         else:
             self._whose_turn_label.configure(text= "{}'s turn".format(color_converter[othello_game.whose_turn]))
 
         self._piece_count_label.configure(text = 'FULL\nBlack: {}   White: {}'.format(piece_counts.black,
                                                                                     piece_counts.white))
 
-        for row in range(len(othello_game.board_state)):
-            for piece in range(len(othello_game.board_state[row])):
-                box_coords = self._boxes_coordinates_list[row][piece]
-                self._canvas.create_rectangle(box_coords, fill=BOARD_COLOR, outline='black')
-                if othello_game.board_state[row][piece] != 0:
-                    self._canvas.create_oval(box_coords, fill = color_converter[othello_game.board_state[row][piece]])
+        if len(self._square_items) == 0:
+            self._create_square_items()
+            changed_squares = None
+        if changed_squares is None:
+            changed_squares = self._square_items
+
+        board_state = othello_game.board_state
+        for row, column in changed_squares:
+            disc = self._square_items[(row, column)][1]
+            piece = board_state[row][column]
+            if piece == 0:
+                self._canvas.itemconfigure(disc, state=tkinter.HIDDEN)
+            else:
+                self._canvas.itemconfigure(disc, fill=color_converter[piece], state=tkinter.NORMAL)
+        self._draw_hints(game_over)
+        self._schedule_computer_move()
         return
 
+    def _dump_stats(self) -> None:
+        """Writes the profiling stats the first time the game ends or the window closes, not on every redraw."""
+        if not self._stats_dumped:
+            othello_profile.dump_stats()
+            self._stats_dumped = True
+
+    def _draw_hints(self, game_over: bool) -> None:
+        """If hints are on and a human player is to move, shows the flip count of each of their legal moves over
+        its square. Hides the hints of the previous position that no longer apply."""
+        hints = {}
+        if self._show_hints.get() and not game_over and othello_game.whose_turn != self._computer_player:
+            hints = self._get_legal_moves()
+        for square in self._hinted_squares.difference(hints):
+            self._canvas.itemconfigure(self._hint_items[square], state=tkinter.HIDDEN)
+        for square, flips in hints.items():
+            self._canvas.itemconfigure(self._hint_items[square], text=str(flips), state=tkinter.NORMAL)
+        self._hinted_squares = set(hints)
+
+    def _get_legal_moves(self) -> {tuple: int}:
+        """Returns the legal moves of the player to move mapped to the number of discs each flips, for the hints.
+        They are counted in one pass per position and cached under its position hash until the position changes."""
+        key = othello_game.get_position_hash()
+        if key != self._legal_moves_key:
+            self._legal_moves = othello_game.get_flip_counts()
+            self._legal_moves_key = key
+        return self._legal_moves
+
+    def _on_hints_toggled(self) -> None:
+        """Shows or hides the legal move hints when the Show Moves box is toggled."""
+        if len(self._square_items) != 0:
+            self._draw_hints(othello_game.is_game_over())
+
+    def _create_square_items(self) -> None:
+        """Creates one rectangle, one (hidden) disc and one (hidden) hint text item per square of the board and
+        keeps their item IDs."""
+        for row, column in self._geometry.get_squares():
+            box_coords = self._geometry.get_box(row, column)
+            rectangle = self._canvas.create_rectangle(box_coords, fill=BOARD_COLOR, outline='black')
+            disc = self._canvas.create_oval(box_coords, state=tkinter.HIDDEN)
+            self._square_items[(row, column)] = (rectangle, disc)
+            self._hint_items[(row, column)] = self._canvas.create_text(
+                self._get_center(box_coords), fill=HINT_COLOR, font=DEFAULT_FONT, state=tkinter.HIDDEN)
+
+    def _get_center(self, box_coords: tuple) -> tuple:
+        """Takes in a ((left, top), (right, bottom)) box and returns the pixel coordinates of its center."""
+        return (box_coords[0][0] + box_coords[1][0]) / 2, (box_coords[0][1] + box_coords[1][1]) / 2
+
     def _on_canvas_clicked(self, event: tkinter.Event):
-        """When the canvas is clicked compares the coordinates with corresponding box coordinates to make a
-               move of the piece at a certain row and column."""
-        for row in range(len(self._boxes_coordinates_list)):
-            for column in range(len(self._boxes_coordinates_list[row])):
-                box = self._boxes_coordinates_list[row][column]
-                if box[1][0] > event.x > box[0][0] and box[1][1] > event.y > box[0][1]:
-                    self._make_move(row, column)
+        """When the canvas is clicked maps the click to the square under it and makes a move of the piece at
+               that row and column. Clicks are ignored during the computer's turn, and clicks on squares that are
+               not legal moves are rejected by a lookup in the game's valid move set without redrawing."""
+        if othello_game.whose_turn == self._computer_player:
+            return None
+        square = self._geometry.get_square(event.x, event.y)
+        if square is not None and othello_game.is_legal_move(square):
+            self._make_move(square[0], square[1])
         return None
 
-    def _on_canvas_resized(self, event: tkinter.Event) -> None:
-        """When the canvas is resized, deletes the current canvas, updates the coordinates, and redraws the board."""
-        self._canvas.delete(tkinter.ALL)
-        self._update_boxes_coordinates_list()
-        self._draw_board()
+    def _on_canvas_resized(self, width: int, height: int) -> None:
+        """When the canvas has settled at a new width and height, updates the coordinates and moves the existing
+        square, disc and hint items to them with coords. The board is drawn the first time the canvas gets its size."""
+        self._geometry.resize(width, height)
+        if len(self._square_items) == 0:
+            self._draw_board()
+            return
+        for (row, column), items in self._square_items.items():
+            box = self._geometry.get_box(row, column)
+            for item in items:
+                self._canvas.coords(item, box[0][0], box[0][1], box[1][0], box[1][1])
+            self._canvas.coords(self._hint_items[(row, column)], *self._get_center(box))
 
     def _make_move(self, row: int, column: int)-> None:
-        """Try's  to make a move on the OthelloGame at the row and column given, redraws the board.
-        If the move is not valid catches the  othello_logic InvalidMoveError, and Redraws the board."""
+        """Try's  to make a move on the OthelloGame at the row and column given and redraws the squares it changed.
+        If the move is not valid catches the  othello_logic InvalidMoveError and leaves the board as it is."""
         try:
-            othello_game.make_move((row,column))
+            record = othello_game.make_move((row,column))
         except othello_logic.InvalidMoveError:
-            pass
-        self._draw_board()
+            return
+        self._record_move(record)
+        self._draw_board(self._get_changed_squares([record]))
         return
 
-    def _update_boxes_coordinates_list(self) -> None:
-        """Takes the list of boxes coordinates and updates them to the current size of the window."""
-        self._width = self._canvas.winfo_width()
-        self._height = self._canvas.winfo_height()
-
-        BOARD_RATIO1 = (0.05, 0.05)
-        BOARD_RATIO2 = (0.95, 0.95)
-        board_corner1 = self._frac_to_pixel(BOARD_RATIO1)
-        board_corner2 = self._frac_to_pixel(BOARD_RATIO2)
-
-        rows = othello_game.BOARD_SIZE[0]
-        columns = othello_game.BOARD_SIZE[1]
-
-        rows_space = (board_corner2[1] - board_corner1[1]) / rows
-        cols_space = (board_corner2[0] - board_corner1[0]) / columns
-
-        list_of_boxes = []
-
-        for row in range(rows):
-            sublist = []
-            coordinate = [(board_corner1[0], board_corner1[1] + rows_space * row),
-                          (board_corner1[0] + cols_space, board_corner1[1] + rows_space * row + rows_space)]
-            for column in range(columns):
-                sublist.append(((coordinate[0][0] + cols_space * column, coordinate[0][1]),
-                                (coordinate[1][0] + cols_space * column, coordinate[1][1])))
-            list_of_boxes.append(sublist)
-
-        self._boxes_coordinates_list = list_of_boxes
-
-    def _frac_to_pixel(self, coordinates: tuple) -> tuple:
-        """Takes in a coordinate tuple in ratio (fraction) form and returns a tuple of their pixel values."""
-        return (coordinates[0] * self._width, coordinates[1] * self._height)
-
-    def _pixel_to_frac(self, pixel_coordinates: tuple) -> tuple:
-        """Takes in a coordinate tuple  in pixels and returns a tuple of their ratio (fraction) values."""
-        return (pixel_coordinates[0] / self._width, pixel_coordinates[1] / self._height)
+    def _get_changed_squares(self, records: [othello_logic.MoveRecord]) -> [tuple]:
+        """Returns the squares placed or flipped by the moves in a list of MoveRecords."""
+        changed_squares = []
+        for record in records:
+            changed_squares.append(record.coordinates)
+            changed_squares.extend(record.flipped)
+        return changed_squares
+
+    def _record_move(self, record: othello_logic.MoveRecord) -> None:
+        """Adds a move just made to the replay behind the move scrubber. A move made while looking at an earlier
+        position replaces the moves that followed it."""
+        if self._ply < len(self._replay):
+            self._replay.truncate(self._ply)
+        self._replay.record_move(othello_game, record)
+        self._ply = len(self._replay)
+        self._update_scrubber()
+
+    def _update_scrubber(self) -> None:
+        """Sets the move scrubber's range to the moves of the replay and its slider to the current ply."""
+        self._scrubber.configure(to=len(self._replay))
+        self._scrubber.set(self._ply)
+
+    def _on_scrubbed(self, value: str) -> None:
+        """When the move scrubber is dragged shows the position after that many moves."""
+        ply = int(float(value))
+        if ply != self._ply:
+            self._seek(ply)
+
+    def _seek(self, ply: int) -> None:
+        """Sets the OthelloGame to the position after ply moves of the replay and redraws the squares that differ
+        from the position shown before. A search for the position being left is cancelled, and the computer does
+        not move while an earlier position is shown."""
+        self._engine_worker.cancel_all()
+        self._canvas.configure(cursor='')
+        previous_board = [row[:] for row in othello_game.board_state]
+        self._replay.seek(ply, othello_game)
+        self._ply = ply
+        self._update_scrubber()
+        board_state = othello_game.board_state
+        self._draw_board([(row, column) for row, column in self._geometry.get_squares()
+                          if board_state[row][column] != previous_board[row][column]])
+
+    def _schedule_computer_move(self) -> None:
+        """If it is the computer player's turn (and the game is not over), asks the engine worker to search a copy
+        of the position and shows that the computer is thinking. The window stays responsive meanwhile. Nothing
+        is searched while the scrubber shows an earlier position."""
+        if othello_game.whose_turn != self._computer_player or self._engine_worker.is_busy():
+            return
+        if self._ply < len(self._replay):
+            return
+        if othello_game.is_game_over():
+            return
+        self._engine_worker.submit(self._search_engine.find_best_move, (othello_search.copy_game(othello_game),),
+                                   self._make_computer_move, self._search_engine.stop,
+                                   self._search_engine.clear_stop)
+        self._whose_turn_label.configure(text=self._whose_turn_label.cget('text') + '\nThinking...')
+        self._canvas.configure(cursor='watch')
+
+    def _make_computer_move(self, result: othello_search.SearchResult) -> None:
+        """Makes the move the search engine found for the computer player and redraws the squares it changed."""
+        self._canvas.configure(cursor='')
+        if othello_game.whose_turn != self._computer_player:
+            return
+        move = result.move
+        records = []
+        if move is not None:
+            records.append(othello_game.make_move(move))
+            self._record_move(records[-1])
+        self._draw_board(self._get_changed_squares(records))
+
+    def _on_undo_button(self) -> None:
+        """Steps the replay back one move and redraws the board. Does nothing at the first move."""
+        self._step_history(-1)
+
+    def _on_redo_button(self) -> None:
+        """Steps the replay forward one move and redraws the board. Does nothing at the last move."""
+        self._step_history(1)
+
+    def _step_history(self, step: int) -> None:
+        """Seeks step (-1 or 1) moves back or forward in the replay. When playing against the computer keeps
+        stepping until it is the human player's turn so the computer does not immediately replay its move."""
+        ply = self._ply + step
+        if not 0 <= ply <= len(self._replay):
+            return
+        while 0 < ply < len(self._replay) and self._replay.get_turn(ply) == self._computer_player:
+            ply += step
+        self._seek(ply)
 
 
 class BoardSelection:
     """Controls the user's selection of an initial board. This initial board (the white and then black pieces)
     are then passed to the OthelloGame object for use in the board_state."""
-    def __init__(self):
-        """Initializes the tkinter self._root_window and attributes (buttons, labels, etc)."""
-        self._width = 600
-        self._height = 600
+    def __init__(self, resize_interval: int = RESIZE_DEBOUNCE_MS):
+        """Initializes the tkinter self._root_window and attributes (buttons, labels, etc). Window resizes are
+        redrawn resize_interval milliseconds after the last <Configure> event of a burst."""
         self._root_window = tkinter.Tk()
+        self._geometry = BoardGeometry(othello_game.BOARD_SIZE[0], othello_game.BOARD_SIZE[1])
 
         self._start_board = self._build_empty_board()
         self._currently_placing = 1
-        self._boxes_coordinates_list = [[]]
         self._piece_list = []
 
         ###############
@@ -167,7 +504,8 @@ class BoardSelection:
         ################
 
         self._canvas.bind('<Button-1>', self._on_canvas_clicked)
-        self._canvas.bind('<Configure>', self._on_canvas_resized)
+        self._resize_debouncer = ResizeDebouncer(self._canvas, self._on_canvas_resized, resize_interval)
+        self._canvas.bind('<Configure>', self._resize_debouncer.on_configure)
 
 
         self._root_window.rowconfigure(0, weight=1)
@@ -182,66 +520,27 @@ class BoardSelection:
     def _draw_board(self) -> None:
         """Draws the board, first boxes and then the pieces (from pieces_list) which overlay on top of the board."""
         color_converter = {-1: 'white', 1: 'black'}
-        for row in self._boxes_coordinates_list:
-            for box in row:
-                self._canvas.create_rectangle(box, fill=BOARD_COLOR, outline='black')
+        for row, column in self._geometry.get_squares():
+            self._canvas.create_rectangle(self._geometry.get_box(row, column), fill=BOARD_COLOR, outline='black')
         for piece in self._piece_list:
-            self._canvas.create_oval(self._boxes_coordinates_list[piece[0]][piece[1]], fill = color_converter[piece[2]])
-
-    def _update_boxes_coordinates_list(self) -> None:
-        """Takes the list of boxes coordinates and updates them to the current size of the window."""
-        self._width = self._canvas.winfo_width()
-        self._height = self._canvas.winfo_height()
-
-        BOARD_RATIO1 = (0.05, 0.05)
-        BOARD_RATIO2 = (0.95, 0.95)
-        board_corner1 = self._frac_to_pixel(BOARD_RATIO1)
-        board_corner2 = self._frac_to_pixel(BOARD_RATIO2)
-
-        rows = othello_game.BOARD_SIZE[0]
-        columns = othello_game.BOARD_SIZE[1]
-
-        rows_space = (board_corner2[1] - board_corner1[1]) / rows
-        cols_space = (board_corner2[0] - board_corner1[0]) / columns
-
-        list_of_boxes = []
-
-        for row in range(rows):
-            sublist = []
-            coordinate = [(board_corner1[0], board_corner1[1] + rows_space * row),
-                          (board_corner1[0] + cols_space, board_corner1[1] + rows_space * row + rows_space)]
-            for column in range(columns):
-                sublist.append(((coordinate[0][0] + cols_space * column, coordinate[0][1]),
-                                (coordinate[1][0] + cols_space * column, coordinate[1][1])))
-            list_of_boxes.append(sublist)
-
-        self._boxes_coordinates_list = list_of_boxes
+            self._canvas.create_oval(self._geometry.get_box(piece[0], piece[1]), fill = color_converter[piece[2]])
 
     def _on_canvas_clicked(self, event: tkinter.Event):
-        """When the canvas is clicked compares the coordinates with corresponding box coordinates to call a placement
-        of the piece at a certain row and column. redraws the board."""
-        for row in range(len(self._boxes_coordinates_list)):
-            for column in range(len(self._boxes_coordinates_list[row])):
-                box = self._boxes_coordinates_list[row][column]
-                if box[1][0] > event.x > box[0][0] and box[1][1] > event.y > box[0][1]:
-                    self._place(row, column)
-                    self._draw_board()
+        """When the canvas is clicked maps the click to the square under it to call a placement of the piece at
+        that row and column. redraws the board."""
+        square = self._geometry.get_square(event.x, event.y)
+        if square is not None:
+            self._place(square[0], square[1])
+            self._draw_board()
         return None
 
-    def _on_canvas_resized(self, event: tkinter.Event) -> None:
-        """When the canvas is resized, deletes the current canvas, updates the coordinates, and redraws the board."""
+    def _on_canvas_resized(self, width: int, height: int) -> None:
+        """When the canvas has settled at a new width and height, deletes the current canvas, updates the
+        coordinates, and redraws the board."""
         self._canvas.delete(tkinter.ALL)
-        self._update_boxes_coordinates_list()
+        self._geometry.resize(width, height)
         self._draw_board()
 
-    def _frac_to_pixel(self, coordinates: tuple) -> tuple:
-        """Takes in a coordinate tuple in ratio (fraction) form and returns a tuple of their pixel values."""
-        return (coordinates[0] * self._width, coordinates[1] * self._height)
-
-    def _pixel_to_frac(self, pixel_coordinates: tuple) -> tuple:
-        """Takes in a coordinate tuple  in pixels and returns a tuple of their ratio (fraction) values."""
-        return (pixel_coordinates[0] / self._width, pixel_coordinates[1] / self._height)
-
     def _build_empty_board(self) -> list:
         """Builds an initial empty board based on the number of rows and columns that the user passed to
         the OthelloGame object."""
@@ -367,11 +666,45 @@ class StartGameInfo:
             row=4, column=1, padx=10, pady=1,
             sticky=tkinter.W + tkinter.E)
 
+        #   ASK COMPUTER PLAYER:
+        computer_player_label = tkinter.Label(
+            master=self._game_info_window, text='Which player does the computer play? ("Black", "White" or "None"):',
+            font=DEFAULT_FONT)
+
+        computer_player_label.grid(
+            row=5, column=0, padx=10, pady=10,
+            sticky=tkinter.W)
+
+        self._computer_player_entry = tkinter.Entry(
+            master=self._game_info_window, width=20, font=DEFAULT_FONT)
+        self._computer_player_entry.insert(0, 'None')
+
+        self._computer_player_entry.grid(
+            row=5, column=1, padx=10, pady=1,
+            sticky=tkinter.W + tkinter.E)
+
+        #   ASK COMPUTER TIME BUDGET:
+        time_budget_label = tkinter.Label(
+            master=self._game_info_window, text='Computer thinking time per move (milliseconds):',
+            font=DEFAULT_FONT)
+
+        time_budget_label.grid(
+            row=6, column=0, padx=10, pady=10,
+            sticky=tkinter.W)
+
+        self._time_budget_entry = tkinter.Entry(
+            master=self._game_info_window, width=20, font=DEFAULT_FONT)
+        self._time_budget_entry.insert(0, str(int(othello_search.DEFAULT_TIME_BUDGET * 1000)))
+
+        self._time_budget_entry.grid(
+            row=6, column=1, padx=10, pady=1,
+            sticky=tkinter.W + tkinter.E)
+
         #   BUTTONS:
         button_frame = tkinter.Frame(master=self._game_info_window)
 
         button_frame.grid(
-            row=5, column=0, columnspan=2, padx=10, pady=10,
+            row=7, column=0, columnspan=2, padx=10, pady=10,
             sticky=tkinter.E + tkinter.S)
 
         enter_button = tkinter.Button(
@@ -394,6 +727,8 @@ class StartGameInfo:
         self._columns = ''
         self._first_move = ''
         self._winner_condition = ''
+        self._computer_player = ''
+        self._time_budget = ''
 
     def show(self) -> None:
         """Shows the _game_info_window to the user."""
@@ -420,6 +755,14 @@ class StartGameInfo:
         """Returns the self._winner_conditon variable."""
         return self._winner_condition
 
+    def get_computer_player(self) -> str:
+        """Returns the self._computer_player variable."""
+        return self._computer_player
+
+    def get_time_budget(self) -> str:
+        """Returns the self._time_budget variable."""
+        return self._time_budget
+
     def _on_ok_button(self) -> None:
         """When the okay button is pressed gets all of the entries and sets them to the object variables.
         Finishes by destroying the window."""
@@ -428,6 +771,8 @@ class StartGameInfo:
         self._columns = self._columns_entry.get()
         self._first_move = self._first_move_entry.get()
         self._winner_condition = self._winner_condition_entry.get()
+        self._computer_player = self._computer_player_entry.get()
+        self._time_budget = self._time_budget_entry.get()
 
         self._game_info_window.destroy()
 
@@ -465,10 +810,23 @@ class PreGame:
             row=2, column=0, padx=10, pady=10,
             sticky=tkinter.N)
 
+        self._computer_player = None
+        self._time_budget = othello_search.DEFAULT_TIME_BUDGET
+        self._game_computer_player = None
+        self._game_time_budget = othello_search.DEFAULT_TIME_BUDGET
+
     def start(self) -> None:
         """Runs mainloop on the tkinter self._root_window."""
         self._root_window.mainloop()
 
+    def get_computer_player(self) -> int or None:
+        """Returns the player the computer plays (1 for black, -1 for white) or None if both players are human."""
+        return self._game_computer_player
+
+    def get_time_budget(self) -> float:
+        """Returns the computer player's thinking time per move in seconds."""
+        return self._game_time_budget
+
     def _on_play(self) -> None:
         """Controls what to do when the play button is pressed. Runs StartGameInfo() also. Checks whether inputs
         are valid against the _check_valid function. If not runs the InvalidInput() Class.
@@ -482,6 +840,8 @@ class PreGame:
             self._cols = self.game_info.get_num_columns()
             self._first_move = self.game_info.get_first_move()
             self._winner_condition = self.game_info.get_winner_condition()
+            self._computer_player = self.game_info.get_computer_player()
+            self._time_budget = self.game_info.get_time_budget()
 
             # self._row_col_text.set('Hello, {} {}!'.format(rows, cols))
 
@@ -489,6 +849,7 @@ class PreGame:
                 invalid = InvalidInput()
                 invalid.start()
                 self._on_play()
+                return
 
             self._segue_to_game()
 
@@ -498,10 +859,13 @@ class PreGame:
 
         WINNER_CONDITION_CONVERTER = {'more': '>', 'fewer': '<'}
         WHOSE_TURN_CONVERTER = {'black': 1, 'white': -1}
+        COMPUTER_PLAYER_CONVERTER = {'black': 1, 'white': -1, 'none': None, '': None}
 
         othello_game.BOARD_SIZE = (self._rows, self._cols)
         othello_game.whose_turn = WHOSE_TURN_CONVERTER[self._first_move]
         othello_game.WINNER_CONDITION = WINNER_CONDITION_CONVERTER[self._winner_condition]
+        self._game_computer_player = COMPUTER_PLAYER_CONVERTER[self._computer_player]
+        self._game_time_budget = self._time_budget / 1000
         try:
             self._root_window.destroy()
         except tkinter.TclError:
@@ -514,6 +878,8 @@ class PreGame:
             self._cols = int(self._cols.strip(' '))
             self._first_move = self._first_move.strip(' ').lower()
             self._winner_condition = self._winner_condition.strip(' ').lower()
+            self._computer_player = self._computer_player.strip(' ').lower()
+            self._time_budget = int(self._time_budget.strip(' '))
         except (ValueError, AttributeError):
             return False
 
@@ -523,6 +889,8 @@ class PreGame:
             return False
         if not (self._winner_condition == 'more' or self._winner_condition == 'fewer'):
             return False
+        if self._computer_player not in ('black', 'white', 'none', '') or self._time_budget <= 0:
+            return False
         return True
 
 
@@ -551,7 +919,9 @@ class InvalidInput:
 
 
 if __name__ == '__main__':
+    othello_profile.enable_from_environment(MainGameGui)
     othello_game = OthelloGame()    #   Create a new OthelloGame object for controlling game logic.
-    PreGame().start()
+    pre_game = PreGame()
+    pre_game.start()
     BoardSelection().run()
-    MainGameGui().run()
\ No newline at end of file
+    MainGameGui(pre_game.get_computer_player(), pre_game.get_time_budget()).run()
\ No newline at end of file
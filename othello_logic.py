@@ -3,7 +3,9 @@
 # othello_logic.py
 # This program handles the underlying game logic of the Othello Game utlilizing one main class: Othello.
 
-from collections import namedtuple
+import itertools
+from array import array
+from collections import deque, namedtuple
 
 
 class InvalidBoardError(Exception):
@@ -21,12 +23,170 @@ class InvalidFlipError(Exception):
     pass
 
 
+PieceCounts = namedtuple('PieceCounts', 'empty black white')
+MoveRecord = namedtuple('MoveRecord', 'coordinates flipped player')
+
+ZobristKeys = namedtuple('ZobristKeys', 'squares side condition size')
+
+HISTORY_LIMIT = 256
+START_LAYOUTS = ('standard', 'flipped')
+MOVE_ORDERS = ('board', 'corners', 'flips')
+
+DIRECTIONS = ((1, -1), (1, 0), (1, 1),
+              (-1, -1), (-1, 0), (-1, 1),
+              (0, -1), (0, 1))
+
+
+_zobrist_tables = {}
+_ray_tables = {}
+
+
+def build_start_board(rows: int, columns: int, layout: str = 'standard') -> [[int]]:
+    """Builds a board of the given size with the four center discs placed. The 'standard' layout puts white on the
+    top-left to bottom-right diagonal and black on the other; 'flipped' swaps the colors. Raises an
+    InvalidBoardError for any other layout."""
+
+    if layout not in START_LAYOUTS:
+        raise InvalidBoardError('Invalid starting layout: Must be one of {}'.format(', '.join(START_LAYOUTS)))
+    diagonal = -1 if layout == 'standard' else 1
+    board = [[0] * columns for row in range(rows)]
+    top = rows // 2 - 1
+    left = columns // 2 - 1
+    board[top][left] = diagonal
+    board[top + 1][left + 1] = diagonal
+    board[top][left + 1] = -diagonal
+    board[top + 1][left] = -diagonal
+    return board
+
+
+def _splitmix64(state: int) -> tuple:
+    """Advances a splitmix64 generator. Returns a (new state, 64 bit random value) tuple."""
+
+    state = (state + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    value = state
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return state, value ^ (value >> 31)
+
+
+def get_zobrist_keys(rows: int, columns: int) -> ZobristKeys:
+    """Returns the Zobrist keys for a board of the given size: squares[piece][row][column] for each black (1) and
+    white (-1) piece, a key for each side to move, for each winner condition and for the board size itself.
+    The keys are generated once per size from a seed derived from the size, so they are the same in every
+    process and every run."""
+
+    if (rows, columns) not in _zobrist_tables:
+        state = rows * 100 + columns
+        squares = {}
+        for piece in (1, -1):
+            squares[piece] = []
+            for row in range(rows):
+                keys = []
+                for column in range(columns):
+                    state, key = _splitmix64(state)
+                    keys.append(key)
+                squares[piece].append(keys)
+        side = {}
+        for player in (1, -1):
+            state, side[player] = _splitmix64(state)
+        condition = {}
+        for winner_condition in ('>', '<'):
+            state, condition[winner_condition] = _splitmix64(state)
+        state, size = _splitmix64(state)
+        _zobrist_tables[(rows, columns)] = ZobristKeys(squares, side, condition, size)
+    return _zobrist_tables[(rows, columns)]
+
+
+def get_ray_table(rows: int, columns: int) -> [[tuple]]:
+    """Returns the rays of a board of the given size: table[row][column] is a tuple holding, for each of the
+    DIRECTIONS that does not leave the board straight away, the tuple of (row, column) squares from that square's
+    neighbor outwards to the edge of the board. Built once per size and shared by every game, so scanning a ray
+    needs no coordinate arithmetic or bounds checks."""
+
+    if (rows, columns) not in _ray_tables:
+        table = []
+        for row in range(rows):
+            table_row = []
+            for column in range(columns):
+                rays = []
+                for row_step, column_step in DIRECTIONS:
+                    ray = []
+                    ray_row = row + row_step
+                    ray_column = column + column_step
+                    while rows > ray_row >= 0 and columns > ray_column >= 0:
+                        ray.append((ray_row, ray_column))
+                        ray_row += row_step
+                        ray_column += column_step
+                    if len(ray) > 0:
+                        rays.append(tuple(ray))
+                table_row.append(tuple(rays))
+            table.append(table_row)
+        _ray_tables[(rows, columns)] = table
+    return _ray_tables[(rows, columns)]
+
+
+class GameState:
+    """Compact snapshot of an Othello position: the board size, whose turn it is, the winner condition and the
+    board as one flat array('b') of rows * columns signed bytes in row order (0 empty, 1 black, -1 white).
+    It has no instance dictionary, clones with one buffer copy and pickles to a few dozen bytes more than the
+    board itself, so it is cheap to ship to worker processes."""
+
+    __slots__ = ('rows', 'columns', 'whose_turn', 'winner_condition', 'board')
+
+    def __init__(self, rows: int, columns: int, whose_turn: int, winner_condition: str, board: bytes = None):
+        """Initializes the state. board is the flat board as bytes or an array('b') (an empty board if None)."""
+
+        self.rows = rows
+        self.columns = columns
+        self.whose_turn = whose_turn
+        self.winner_condition = winner_condition
+        self.board = array('b', board if board is not None else bytes(rows * columns))
+
+    @classmethod
+    def from_board_state(cls, board_state: [[int]], whose_turn: int, winner_condition: str) -> 'GameState':
+        """Returns the GameState of a list of lists board_state with the given turn and winner condition."""
+
+        state = cls(len(board_state), len(board_state[0]) if board_state else 0, whose_turn, winner_condition, b'')
+        state.board = array('b', itertools.chain.from_iterable(board_state))
+        return state
+
+    @property
+    def board_state(self) -> [[int]]:
+        """The board as a new list of lists of ints, one list per row, as OthelloGame.board_state holds it."""
+
+        board = self.board
+        columns = self.columns
+        return [board[start:start + columns].tolist() for start in range(0, self.rows * columns, columns or 1)]
+
+    def clone(self) -> 'GameState':
+        """Returns a copy of the state with its own board buffer."""
+        return GameState(self.rows, self.columns, self.whose_turn, self.winner_condition, self.board)
+
+    def __eq__(self, other) -> bool:
+        """Returns True if other is a GameState of the same position."""
+
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return ((self.rows, self.columns, self.whose_turn, self.winner_condition, self.board) ==
+                (other.rows, other.columns, other.whose_turn, other.winner_condition, other.board))
+
+    def __reduce__(self) -> tuple:
+        """Pickles the state as its fields and the raw bytes of the board."""
+        return GameState, (self.rows, self.columns, self.whose_turn, self.winner_condition, self.board.tobytes())
+
+
 class OthelloGame:
     """Main class for the Othello Game. Multiple functions for manipulating the internal game logic and
-    variables and running a game of Othello."""
+    variables and running a game of Othello. The attributes are fixed by __slots__, so a game has no instance
+    dictionary; clone() copies one without rebuilding anything and a pickled game is its GameState."""
+
+    __slots__ = ('_EMPTY', '_BLACK', '_WHITE', 'BOARD_SIZE', 'WINNER_CONDITION', 'whose_turn', '_board_state',
+                 '_rays', '_frontier', '_valid_moves', '_piece_counts', '_zobrist_keys', '_board_hash', '_history',
+                 '_redo_stack')
 
-    def __init__(self):
-        """Inititalizes all of the variables used in the Othello object."""
+    def __init__(self, history_limit: int = HISTORY_LIMIT):
+        """Inititalizes all of the variables used in the Othello object. history_limit bounds how many moves
+        can be undone."""
 
         self._EMPTY = 0
         self._BLACK = 1
@@ -34,31 +194,93 @@ class OthelloGame:
         self.BOARD_SIZE = (0, 0)
         self.WINNER_CONDITION = ''
 
+        self._frontier = set()
+        self._valid_moves = {self._BLACK: set(), self._WHITE: set()}
+        self._piece_counts = {self._EMPTY: 0, self._BLACK: 0, self._WHITE: 0}
+        self._zobrist_keys = get_zobrist_keys(0, 0)
+        self._board_hash = 0
+        self._history = deque(maxlen=history_limit)
+        self._redo_stack = []
         self.board_state = [[]]
         self.whose_turn = 0
 
-    def make_move(self, coordinates: tuple):
+    @property
+    def board_state(self) -> [[int]]:
+        """The board as a list of lists of ints (0 empty, 1 black, -1 white), one list per row."""
+        return self._board_state
+
+    @board_state.setter
+    def board_state(self, board: [[int]]) -> None:
+        """Stores a board_state assigned from outside (the console or the board selection window) and rebuilds
+        the piece counts, Zobrist hash, frontier and valid move sets from scratch. Moves made through make_move
+        update them in place. Clears the undo and redo history since it belongs to the previous board.
+        Also picks the shared ray table for the size of the board."""
+        self._board_state = board
+        self._rays = get_ray_table(len(board), len(board[0]) if len(board) > 0 else 0)
+        self._recount_pieces()
+        self._rehash_board()
+        self._rebuild_valid_moves()
+        self._history.clear()
+        self._redo_stack = []
+
+    def make_move(self, coordinates: tuple) -> MoveRecord:
             """Takes in a set of coordinates (row, column) as a tuple. Attempts to make a move on that spot
-            and raises an InvalidMoveError if the move attempt is unsuccessful. Creates a list of pieces
-            which must be flipped using the _get_flipped_pieces() function based on the coordinates given.
-            Flips those pieces one at a time using the _flip_piece() function.
-            Switches to the next player's turn at the end of the move. """
-
-            try:
-                if self.board_state[coordinates[0]][coordinates[1]] != self._EMPTY:
-                    raise InvalidMoveError
-            except IndexError:
+            and raises an InvalidMoveError if the move attempt is unsuccessful (the spot is not in the current
+            player's valid move set). Creates a list of pieces which must be flipped using the
+            _get_flipped_pieces() function based on the coordinates given. Flips those pieces one at a time
+            using the _flip_piece() function and updates the valid move sets around the changed squares.
+            Switches to the next player's turn at the end of the move.
+            Returns a MoveRecord of the move (coordinates, flipped pieces and the player who moved) which can be
+            passed to unmake_move. The record is also pushed on the undo history and the redo history is cleared."""
+
+            record = self._apply_move(coordinates)
+            self._history.append(record)
+            self._redo_stack = []
+            return record
+
+    def unmake_move(self, record: MoveRecord = None) -> MoveRecord:
+        """Takes back the move described by record (the most recent move in the history if no record is passed)
+        restoring the exact board, piece counts, valid moves and turn from before it was made. Only the placed
+        and flipped squares are touched. The record must be the last move applied to the board.
+        Raises an InvalidMoveError if there is no move to take back. Returns the record taken back."""
+
+        if record is None:
+            if len(self._history) == 0:
                 raise InvalidMoveError
-
-            to_be_flipped = self._get_flipped_pieces(coordinates)
-            if len(to_be_flipped) <= 0:
-                raise InvalidMoveError
-
-            else:
-                self.board_state[coordinates[0]][coordinates[1]] = self.whose_turn
-                for piece in to_be_flipped:
-                    self._flip_piece(piece)
-            self._switch_turns()
+            record = self._history.pop()
+        elif len(self._history) > 0 and self._history[-1] is record:
+            self._history.pop()
+
+        row, column = record.coordinates
+        self.board_state[row][column] = self._EMPTY
+        self._piece_counts[record.player] -= 1
+        self._piece_counts[self._EMPTY] += 1
+        self._board_hash ^= self._zobrist_keys.squares[record.player][row][column]
+        for piece in record.flipped:
+            self._flip_piece(piece)
+        self._update_valid_moves(record.coordinates, record.flipped)
+        self.whose_turn = record.player
+        return record
+
+    def undo(self) -> MoveRecord:
+        """Takes back the most recent move in the history and keeps it so it can be redone.
+        Raises an InvalidMoveError if there is nothing to undo. Returns the record taken back."""
+
+        record = self.unmake_move()
+        self._redo_stack.append(record)
+        return record
+
+    def redo(self) -> MoveRecord:
+        """Plays the most recently undone move again for the player who originally made it.
+        Raises an InvalidMoveError if there is nothing to redo. Returns the new record of the move."""
+
+        if len(self._redo_stack) == 0:
+            raise InvalidMoveError
+        undone = self._redo_stack.pop()
+        self.whose_turn = undone.player
+        record = self._apply_move(undone.coordinates)
+        self._history.append(record)
+        return record
 
     def is_game_over(self) -> bool:
         """Checks the game board and other othello game-states to find out if the game is over or not
@@ -77,81 +299,313 @@ class OthelloGame:
         return False
 
     def get_winner(self)-> int or None:
-        """Checks the winner condition against a dictionary to call upon the _get_winner_most and
-        _get_winner_least functions in order to return the winner of the othello game or None if
+        """Checks the winner condition against a dictionary to call upon only the matching _get_winner_most or
+        _get_winner_least function in order to return the winner of the othello game or None if
         the players are tied."""
 
-        winner_condition_converter = {'>': self._get_winner_most(), '<': self._get_winner_least()}
-        return winner_condition_converter[self.WINNER_CONDITION]
-
-    def get_piece_counts(self) -> namedtuple:
-        """Counts through the board_state of the game to add up the number of each piece that is in play,
-        including empty spaces. Returns a namedtuple containing a .empty .black and .white instances which contain
-        the number of empty black and white pieces currently on the board."""
-
-        piece_counts = namedtuple('piece_counts', 'empty black white')
-        empty = 0
-        black = 0
-        white = 0
+        winner_condition_converter = {'>': self._get_winner_most, '<': self._get_winner_least}
+        return winner_condition_converter[self.WINNER_CONDITION]()
+
+    def get_piece_counts(self) -> PieceCounts:
+        """Returns a PieceCounts namedtuple containing .empty .black and .white instances which contain
+        the number of empty black and white pieces currently on the board. The counts are running totals
+        kept up to date by make_move and _flip_piece, so this does not walk the board."""
+
+        return PieceCounts(self._piece_counts[self._EMPTY], self._piece_counts[self._BLACK],
+                           self._piece_counts[self._WHITE])
+
+    def get_valid_moves(self, player: int = None) -> [tuple]:
+        """Returns a list of (row, column) tuples of every valid move for the player (the current player by default)
+        in board order."""
+        if player is None:
+            player = self.whose_turn
+        return sorted(self._valid_moves.get(player, ()))
+
+    def is_legal_move(self, coordinates: tuple, player: int = None) -> bool:
+        """Returns True if coordinates is a valid move for the player (the current player by default), looked up in
+        the kept valid move set without scanning the board."""
+        if player is None:
+            player = self.whose_turn
+        return coordinates in self._valid_moves.get(player, ())
+
+    def count_valid_moves(self, player: int = None) -> int:
+        """Returns the number of valid moves for the player (the current player by default)."""
+        if player is None:
+            player = self.whose_turn
+        return len(self._valid_moves.get(player, ()))
+
+    def get_flip_counts(self, player: int = None) -> {tuple: int}:
+        """Returns a dictionary mapping every valid move of the player (the current player by default) to the
+        number of pieces it would flip, in one pass over that player's valid move set. The flips are counted,
+        not listed."""
+        if player is None:
+            player = self.whose_turn
+        return {move: self._count_flipped_pieces(move, player) for move in self._valid_moves.get(player, ())}
+
+    def iter_valid_moves(self, player: int = None, order: str = 'board'):
+        """Yields the valid moves of the player (the current player by default) one at a time as (row, column)
+        tuples in the order given: 'board' (row by row), 'corners' (the valid corners first, then board order) or
+        'flips' (most pieces flipped first, ties in board order). No flip lists are built, and a caller that
+        stops early (an existence check or a search cutoff) never looks at the moves after the one it stopped
+        on. Raises a ValueError for an unknown order."""
+
+        if player is None:
+            player = self.whose_turn
+        if order not in MOVE_ORDERS:
+            raise ValueError('order must be one of {}'.format(', '.join(MOVE_ORDERS)))
+        moves = self._valid_moves.get(player, ())
+        if order == 'flips':
+            yield from sorted(moves, key=lambda move: (-self._count_flipped_pieces(move, player), move))
+            return
+        if order == 'corners':
+            last_row = self.BOARD_SIZE[0] - 1
+            last_column = self.BOARD_SIZE[1] - 1
+            corners = [(0, 0), (0, last_column), (last_row, 0), (last_row, last_column)]
+            yield from (corner for corner in corners if corner in moves)
+            moves = moves.difference(corners)
+        yield from sorted(moves)
+
+    def get_state(self) -> GameState:
+        """Returns a GameState snapshot of the position: board size, turn, winner condition and board."""
+        return GameState.from_board_state(self._board_state, self.whose_turn, self.WINNER_CONDITION)
+
+    def set_state(self, state: GameState) -> None:
+        """Sets up the position of a GameState, rebuilding everything derived from the board as assigning
+        board_state does (which also clears the undo and redo history)."""
+
+        self.BOARD_SIZE = (state.rows, state.columns)
+        self.WINNER_CONDITION = state.winner_condition
+        self.whose_turn = state.whose_turn
+        self.board_state = state.board_state
+
+    @classmethod
+    def from_state(cls, state: GameState, history_limit: int = HISTORY_LIMIT) -> 'OthelloGame':
+        """Returns a new OthelloGame set up at the position of a GameState."""
+
+        game = cls(history_limit)
+        game.set_state(state)
+        return game
+
+    def clone(self) -> 'OthelloGame':
+        """Returns a new OthelloGame at the same position, with the board rows, piece counts, frontier and valid
+        move sets copied as they are instead of rebuilt from the board. The undo and redo history is not copied."""
+
+        game = OthelloGame.__new__(OthelloGame)
+        game._EMPTY = self._EMPTY
+        game._BLACK = self._BLACK
+        game._WHITE = self._WHITE
+        game.BOARD_SIZE = self.BOARD_SIZE
+        game.WINNER_CONDITION = self.WINNER_CONDITION
+        game.whose_turn = self.whose_turn
+        game._board_state = [row[:] for row in self._board_state]
+        game._rays = self._rays
+        game._frontier = set(self._frontier)
+        game._valid_moves = {player: set(moves) for player, moves in self._valid_moves.items()}
+        game._piece_counts = dict(self._piece_counts)
+        game._zobrist_keys = self._zobrist_keys
+        game._board_hash = self._board_hash
+        game._history = deque(maxlen=self._history.maxlen)
+        game._redo_stack = []
+        return game
+
+    def __getstate__(self) -> tuple:
+        """Pickles the game as its GameState and history limit. The undo and redo history is not pickled."""
+        return self.get_state(), self._history.maxlen
+
+    def __setstate__(self, pickled: tuple) -> None:
+        """Restores a game pickled by __getstate__, rebuilding what is derived from the board."""
+
+        state, history_limit = pickled
+        self.__init__(history_limit)
+        if state.rows * state.columns > 0:
+            self.set_state(state)
+        else:
+            self.BOARD_SIZE = (0, 0)
+            self.WINNER_CONDITION = state.winner_condition
+            self.whose_turn = state.whose_turn
 
-        for row in self.board_state:
-            for piece in row:
-                if piece == self._EMPTY:
-                    empty += 1
-                elif piece == self._BLACK:
-                    black += 1
-                elif piece == self._WHITE:
-                    white += 1
-                else:
-                    raise InvalidBoardError("The game_board is invalid. All pieces must be '.' 'B' or 'W'")
+    def get_position_hash(self) -> int:
+        """Returns a 64 bit Zobrist hash of the position: the pieces on the board, the board size, whose turn it is
+        and the winner condition. The board part is updated incrementally by make_move and _flip_piece."""
 
-        return piece_counts(empty, black, white)
+        keys = self._zobrist_keys
+        return (self._board_hash ^ keys.size ^ keys.side.get(self.whose_turn, 0)
+                ^ keys.condition.get(self.WINNER_CONDITION, 0))
 
     # PRIVATE FUNCTIONS #
 
-    def _get_flipped_pieces(self, coordinates: tuple):
+    def _apply_move(self, coordinates: tuple) -> MoveRecord:
+        """Validates and plays a move for the current player without touching the undo history.
+        Raises an InvalidMoveError if the coordinates are not in the current player's valid move set.
+        Returns the MoveRecord of the move."""
+
+        coordinates = (coordinates[0], coordinates[1])
+        player = self.whose_turn
+        if coordinates not in self._valid_moves.get(player, ()):
+            raise InvalidMoveError
+
+        to_be_flipped = self._get_flipped_pieces(coordinates)
+        self.board_state[coordinates[0]][coordinates[1]] = player
+        self._piece_counts[self._EMPTY] -= 1
+        self._piece_counts[player] += 1
+        self._board_hash ^= self._zobrist_keys.squares[player][coordinates[0]][coordinates[1]]
+        for piece in to_be_flipped:
+            self._flip_piece(piece)
+        self._update_valid_moves(coordinates, to_be_flipped)
+        self._switch_turns()
+        return MoveRecord(coordinates, to_be_flipped, player)
+
+    def _get_flipped_pieces(self, coordinates: tuple, player: int = None):
         """Takes in a tuple set of coordinates (row, column) and returns a list of tuples: coordinates of Pieces which
-        should be flipped if a player's piece was placed on the coordinates passed. This function is not
-        only used to make a move, but also to check whether there are any valid moves for a player."""
+        should be flipped if a player's piece was placed on the coordinates passed. The player defaults to whose_turn.
+        Each direction is a precomputed ray of the shared ray table: a run of opponent pieces closed by one of the
+        player's pieces is flipped, and the run's squares are taken straight from the ray."""
 
-        directions_list = [(1, -1), (1, 0), (1, 1),
-                           (-1, -1), (-1, 0), (-1, 1),
-                           (0, -1), (0, 1)]
+        if player is None:
+            player = self.whose_turn
+        board = self._board_state
         to_be_flipped = []
-        for direction in directions_list:
-
-            row = coordinates[0] + direction[0]
-            column = coordinates[1] + direction[1]
-
-            potential_flips = []
-
-            while self.BOARD_SIZE[0] > row >= 0 and self.BOARD_SIZE[1] > column >= 0:
-                if self.board_state[row][column] == self._EMPTY:
+        for ray in self._rays[coordinates[0]][coordinates[1]]:
+            run = 0
+            for row, column in ray:
+                piece = board[row][column]
+                if piece == player:
+                    if run > 0:
+                        to_be_flipped += ray[:run]
                     break
-                elif self.board_state[row][column] != self.whose_turn and self.board_state[row][column] != self._EMPTY:
-                    potential_flips.append((row, column))
-
-                elif self.board_state[row][column] == self.whose_turn:
-                    if len(potential_flips) > 0:
-                        to_be_flipped += potential_flips
+                elif piece == self._EMPTY:
                     break
-
-                row += direction[0]
-                column += direction[1]
+                run += 1
 
         return to_be_flipped
 
+    def _count_flipped_pieces(self, coordinates: tuple, player: int) -> int:
+        """Returns the number of pieces player placing a piece on coordinates would flip: the length of
+        _get_flipped_pieces without building the list."""
+
+        board = self._board_state
+        flipped = 0
+        for ray in self._rays[coordinates[0]][coordinates[1]]:
+            run = 0
+            for row, column in ray:
+                piece = board[row][column]
+                if piece == player:
+                    flipped += run
+                    break
+                elif piece == self._EMPTY:
+                    break
+                run += 1
+        return flipped
+
     def _is_any_valid_moves(self) -> bool:
-        """Utilizes the _get_flipped_pieces function primarily to check whether a player has any
-        valid moves available on the board_state. Goes through every available empty space on the board
-        and verifies there is at least one valid move which would flip a piece. If no moves are valid for
+        """Checks whether the current player has any valid moves available on the board_state by looking at
+        the size of that player's valid move set, which make_move keeps up to date. If no moves are valid for
         the player: returns False. Otherwise: Returns True."""
 
-        for row in range(len(self.board_state)):
-            for item in range(len(self.board_state[row])):
-                if self.board_state[row][item] == self._EMPTY:
-                    if len(self._get_flipped_pieces((row, item))) > 0:
+        return len(self._valid_moves.get(self.whose_turn, ())) > 0
+
+    def _is_valid_move(self, coordinates: tuple, player: int) -> bool:
+        """Returns True if player placing a piece on the empty coordinates passed would flip at least one piece.
+        Unlike _get_flipped_pieces it stops at the first direction that flips something."""
+
+        board = self._board_state
+        for ray in self._rays[coordinates[0]][coordinates[1]]:
+            seen_opponent = False
+            for row, column in ray:
+                piece = board[row][column]
+                if piece == self._EMPTY:
+                    break
+                elif piece == player:
+                    if seen_opponent:
                         return True
+                    break
+                seen_opponent = True
+        return False
+
+    def _recount_pieces(self) -> None:
+        """Counts through the board_state of the game to add up the number of each piece that is in play,
+        including empty spaces, and stores them as the running totals. Raises an InvalidBoardError if the board
+        holds anything other than empty, black and white pieces."""
+
+        counts = {self._EMPTY: 0, self._BLACK: 0, self._WHITE: 0}
+        for row in self.board_state:
+            for piece in row:
+                if piece not in counts:
+                    raise InvalidBoardError("The game_board is invalid. All pieces must be '.' 'B' or 'W'")
+                counts[piece] += 1
+        self._piece_counts = counts
+
+    def _rehash_board(self) -> None:
+        """Picks the Zobrist keys for the size of the board_state and hashes every piece on it from scratch."""
+
+        rows = len(self.board_state)
+        columns = len(self.board_state[0]) if rows > 0 else 0
+        self._zobrist_keys = get_zobrist_keys(rows, columns)
+        board_hash = 0
+        for row in range(rows):
+            for column in range(columns):
+                piece = self.board_state[row][column]
+                if piece != self._EMPTY:
+                    board_hash ^= self._zobrist_keys.squares[piece][row][column]
+        self._board_hash = board_hash
+
+    def _rebuild_valid_moves(self) -> None:
+        """Rebuilds the frontier (every empty square next to an occupied one) and both players' valid move sets
+        by scanning the whole board_state. Only needed when board_state is assigned from outside."""
+
+        self._frontier = set()
+        for row in range(self.BOARD_SIZE[0]):
+            for column in range(self.BOARD_SIZE[1]):
+                if self.board_state[row][column] == self._EMPTY and self._has_occupied_neighbor(row, column):
+                    self._frontier.add((row, column))
+
+        for player in (self._BLACK, self._WHITE):
+            self._valid_moves[player] = {square for square in self._frontier
+                                         if self._is_valid_move(square, player)}
+
+    def _update_valid_moves(self, changed: tuple, flipped: [tuple]) -> None:
+        """Updates the frontier and valid move sets after a piece was placed on (or taken back from) changed
+        and the pieces in flipped were flipped. Only an empty square whose ray runs over a contiguous line of
+        pieces to a changed square can change legality, so this walks outwards from each changed square to the
+        first empty square in every direction and rechecks just those squares for both players."""
+
+        board = self._board_state
+        candidates = set()
+        if board[changed[0]][changed[1]] == self._EMPTY:
+            candidates.add(changed)
+        else:
+            self._frontier.discard(changed)
+            for moves in self._valid_moves.values():
+                moves.discard(changed)
+
+        for square in [changed] + flipped:
+            for ray in self._rays[square[0]][square[1]]:
+                for ray_square in ray:
+                    if board[ray_square[0]][ray_square[1]] == self._EMPTY:
+                        candidates.add(ray_square)
+                        break
+
+        for square in candidates:
+            if self._has_occupied_neighbor(square[0], square[1]):
+                self._frontier.add(square)
+                for player, moves in self._valid_moves.items():
+                    if self._is_valid_move(square, player):
+                        moves.add(square)
+                    else:
+                        moves.discard(square)
+            else:
+                self._frontier.discard(square)
+                for moves in self._valid_moves.values():
+                    moves.discard(square)
+
+    def _has_occupied_neighbor(self, row: int, column: int) -> bool:
+        """Returns True if any of the eight squares around (row, column) (the first square of each of its rays)
+        holds a piece."""
+
+        board = self._board_state
+        for ray in self._rays[row][column]:
+            if board[ray[0][0]][ray[0][1]] != self._EMPTY:
+                return True
         return False
 
     def _switch_turns(self):
@@ -163,10 +617,15 @@ class OthelloGame:
         passed by multiplying it by -1. Performs one last check beforehand that the coordinates passed
         are to a valid non-empty space - raises an InvalidFlipError if not."""
 
-        if self.board_state[coordinates[0]][coordinates[1]] == self._EMPTY:
+        piece = self.board_state[coordinates[0]][coordinates[1]]
+        if piece == self._EMPTY:
             raise InvalidFlipError
         else:
-            self.board_state[coordinates[0]][coordinates[1]] *= -1
+            self.board_state[coordinates[0]][coordinates[1]] = -piece
+            self._piece_counts[piece] -= 1
+            self._piece_counts[-piece] += 1
+            self._board_hash ^= (self._zobrist_keys.squares[piece][coordinates[0]][coordinates[1]]
+                                 ^ self._zobrist_keys.squares[-piece][coordinates[0]][coordinates[1]])
 
     def _get_winner_most(self)-> int or None:
         """Returns the winner based on who has the most pieces on the board.
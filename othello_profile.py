@@ -0,0 +1,264 @@
+# othello_profile.py
+# This program is the opt-in instrumentation layer of the Othello Game. When it is enabled it replaces the hot
+# methods of OthelloGame (and the draw and click handlers of othello_gui.MainGameGui) with timing wrappers that keep
+# per-method call counts, cumulative and percentile timings and the number of board squares each call scanned.
+# When it is disabled the original methods are put back, so an uninstrumented game pays nothing at all.
+# Set the OTHELLO_PROFILE environment variable to a file path to profile the console or GUI game: the stats are
+# written to that file as JSON when the game ends, when the process exits and on SIGUSR1.
+
+import atexit
+import functools
+import json
+import os
+import signal
+import threading
+import time
+from collections import deque, namedtuple
+
+from othello_logic import DIRECTIONS, OthelloGame
+
+
+MethodStats = namedtuple('MethodStats', 'calls total_time mean_time p50_time p90_time p99_time max_time '
+                                        'squares_scanned squares_per_call')
+
+PROFILE_ENVIRONMENT_VARIABLE = 'OTHELLO_PROFILE'
+MAX_SAMPLES = 10000
+GAME_METHODS = ('make_move', 'unmake_move', 'is_game_over', 'get_piece_counts', 'get_valid_moves',
+                'get_flip_counts', '_get_flipped_pieces', '_count_flipped_pieces', '_is_any_valid_moves',
+                '_is_valid_move', '_rebuild_valid_moves', '_update_valid_moves')
+GUI_METHODS = ('_draw_board', '_draw_hints', '_on_canvas_clicked', '_on_canvas_resized')
+
+
+class _MethodRecord:
+    """Running totals of one instrumented method. Only the MAX_SAMPLES most recent call times are kept for the
+    percentiles."""
+
+    def __init__(self, max_samples: int):
+        """Initializes an empty record keeping at most max_samples call times."""
+
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.squares_scanned = 0
+        self.samples = deque(maxlen=max_samples)
+
+    def get_stats(self) -> MethodStats:
+        """Returns the MethodStats of the record (times in seconds)."""
+
+        samples = sorted(self.samples)
+        calls = max(self.calls, 1)
+        return MethodStats(self.calls, self.total_time, self.total_time / calls, _get_percentile(samples, 50),
+                           _get_percentile(samples, 90), _get_percentile(samples, 99), self.max_time,
+                           self.squares_scanned, self.squares_scanned / calls)
+
+
+class Profiler:
+    """Instruments methods of classes while it is enabled. enable() swaps each method for a wrapper that times the
+    call and asks the method's scan counter (if it has one) how many squares the call looks at; disable() restores
+    the original methods. Calls from the GUI's engine worker thread are recorded too."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        """Initializes a disabled profiler with no stats."""
+
+        self.max_samples = max_samples
+        self._records = {}
+        self._originals = {}
+        self._lock = threading.Lock()
+
+    def is_enabled(self) -> bool:
+        """Returns True if any method is instrumented."""
+        return len(self._originals) > 0
+
+    def enable(self, gui_class=None) -> None:
+        """Instruments the OthelloGame hot methods, and the draw and click handlers of gui_class (the GUI's
+        MainGameGui, passed in so this module never imports tkinter). Methods that are already instrumented are
+        left alone."""
+
+        self._instrument(OthelloGame, GAME_METHODS)
+        if gui_class is not None:
+            self._instrument(gui_class, GUI_METHODS)
+
+    def disable(self) -> None:
+        """Puts every original method back. The stats collected so far are kept."""
+
+        for (cls, name), function in self._originals.items():
+            setattr(cls, name, function)
+        self._originals = {}
+
+    def reset(self) -> None:
+        """Forgets all the stats collected so far."""
+
+        with self._lock:
+            self._records = {}
+
+    def get_stats(self) -> {str: MethodStats}:
+        """Returns a dictionary of 'Class.method' name to the MethodStats of every method called while enabled."""
+
+        with self._lock:
+            return {name: record.get_stats() for name, record in sorted(self._records.items())}
+
+    def dump(self, path: str) -> None:
+        """Writes the stats to path as a JSON object of 'Class.method' name to stats."""
+
+        stats = {name: method_stats._asdict() for name, method_stats in self.get_stats().items()}
+        with open(path, 'w') as stats_file:
+            json.dump(stats, stats_file, indent=2)
+            stats_file.write('\n')
+
+    # PRIVATE FUNCTIONS #
+
+    def _instrument(self, cls, names: (str,)) -> None:
+        """Replaces each named method of cls with a timing wrapper, remembering the original."""
+
+        for name in names:
+            if (cls, name) not in self._originals:
+                function = cls.__dict__[name]
+                self._originals[(cls, name)] = function
+                setattr(cls, name, self._wrap('{}.{}'.format(cls.__name__, name), function,
+                                              _SCAN_COUNTERS.get(name)))
+
+    def _wrap(self, name: str, function, scan_counter):
+        """Returns a wrapper of function that records its calls under name. scan_counter is called with the same
+        arguments before the call and returns the number of squares the call will scan."""
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            squares = scan_counter(*args, **kwargs) if scan_counter is not None else 0
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._record(name, time.perf_counter() - start, squares)
+        return wrapper
+
+    def _record(self, name: str, elapsed: float, squares: int) -> None:
+        """Adds one call of elapsed seconds that scanned squares squares to the record of name."""
+
+        with self._lock:
+            record = self._records.get(name)
+            if record is None:
+                record = self._records[name] = _MethodRecord(self.max_samples)
+            record.calls += 1
+            record.total_time += elapsed
+            record.max_time = max(record.max_time, elapsed)
+            record.squares_scanned += squares
+            record.samples.append(elapsed)
+
+
+_profiler = Profiler()
+_dump_path = None
+
+
+def get_profiler() -> Profiler:
+    """Returns the Profiler shared by the console and GUI games."""
+    return _profiler
+
+
+def enable_from_environment(gui_class=None) -> bool:
+    """Enables the shared profiler (for gui_class too, if given) if the OTHELLO_PROFILE environment variable names
+    a file. The stats are then written to that file by dump_stats, at exit and on SIGUSR1 (where the platform has
+    it). Returns True if profiling was enabled."""
+
+    global _dump_path
+    path = os.environ.get(PROFILE_ENVIRONMENT_VARIABLE)
+    if not path:
+        return False
+    _dump_path = path
+    _profiler.enable(gui_class)
+    atexit.register(dump_stats)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signal_number, frame: dump_stats())
+    return True
+
+
+def dump_stats() -> None:
+    """Writes the shared profiler's stats to the OTHELLO_PROFILE file. Does nothing if profiling is not enabled,
+    so the games can call it at every game end."""
+
+    if _dump_path is not None and _profiler.is_enabled():
+        _profiler.dump(_dump_path)
+
+
+# PRIVATE FUNCTIONS #
+
+def _get_percentile(samples: [float], percent: int) -> float:
+    """Returns the nearest-rank percent percentile of the sorted samples, or 0.0 if there are none."""
+
+    if len(samples) == 0:
+        return 0.0
+    return samples[min(len(samples) - 1, (len(samples) * percent - 1) // 100)]
+
+
+def _count_ray_squares(game: OthelloGame, coordinates: tuple, player: int, stop_at_flank: bool) -> int:
+    """Returns the number of squares _get_flipped_pieces (or _is_valid_move if stop_at_flank) looks at for player
+    moving on coordinates: each ray is followed over opponent pieces up to and including the first other square."""
+
+    board = game.board_state
+    rows, columns = game.BOARD_SIZE
+    scanned = 0
+    for direction in DIRECTIONS:
+        row = coordinates[0] + direction[0]
+        column = coordinates[1] + direction[1]
+        seen_opponent = False
+        while rows > row >= 0 and columns > column >= 0:
+            scanned += 1
+            piece = board[row][column]
+            if piece == 0:
+                break
+            if piece == player:
+                if seen_opponent and stop_at_flank:
+                    return scanned
+                break
+            seen_opponent = True
+            row += direction[0]
+            column += direction[1]
+    return scanned
+
+
+def _scan_flipped_pieces(game: OthelloGame, coordinates: tuple, player: int = None) -> int:
+    """Scan counter of OthelloGame._get_flipped_pieces."""
+    return _count_ray_squares(game, coordinates, game.whose_turn if player is None else player, False)
+
+
+def _scan_valid_move(game: OthelloGame, coordinates: tuple, player: int) -> int:
+    """Scan counter of OthelloGame._is_valid_move."""
+    return _count_ray_squares(game, coordinates, player, True)
+
+
+def _scan_rebuild_valid_moves(game: OthelloGame) -> int:
+    """Scan counter of OthelloGame._rebuild_valid_moves: every square of the board (the ray scans of the frontier
+    squares are counted by _is_valid_move)."""
+    return game.BOARD_SIZE[0] * game.BOARD_SIZE[1]
+
+
+def _scan_update_valid_moves(game: OthelloGame, changed: tuple, flipped: [tuple]) -> int:
+    """Scan counter of OthelloGame._update_valid_moves: the squares walked outwards from every changed square to
+    the first empty square in each direction."""
+
+    board = game.board_state
+    rows, columns = game.BOARD_SIZE
+    scanned = 0
+    for square in [changed] + list(flipped):
+        for direction in DIRECTIONS:
+            row = square[0] + direction[0]
+            column = square[1] + direction[1]
+            while rows > row >= 0 and columns > column >= 0:
+                scanned += 1
+                if board[row][column] == 0:
+                    break
+                row += direction[0]
+                column += direction[1]
+    return scanned
+
+
+def _scan_draw_board(gui, changed_squares: [tuple] = None) -> int:
+    """Scan counter of MainGameGui._draw_board: the squares it recolors."""
+
+    if changed_squares is None or len(gui._square_items) == 0:
+        return len(gui._geometry.get_squares())
+    return len(changed_squares)
+
+
+_SCAN_COUNTERS = {'_get_flipped_pieces': _scan_flipped_pieces, '_count_flipped_pieces': _scan_flipped_pieces,
+                  '_is_valid_move': _scan_valid_move, '_rebuild_valid_moves': _scan_rebuild_valid_moves,
+                  '_update_valid_moves': _scan_update_valid_moves, '_draw_board': _scan_draw_board}
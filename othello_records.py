@@ -0,0 +1,373 @@
+# othello_records.py
+# This program stores finished Othello games in a compact binary archive. Each record is a 6 byte header (rows,
+# columns, flags for the first player and winner condition, and the number of moves), the initial board as two
+# bit-packed planes (black then white, one bit per square in row order) and one byte per move (row in the high
+# nibble, column in the low nibble), so boards up to 16x16 fit. The reader memory-maps the archive and decodes
+# only the records asked for, copying just their few bytes of planes and moves; an optional index file of record
+# offsets gives random access by game number.
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+from othello_logic import OthelloGame, InvalidBoardError, InvalidMoveError
+import othello_ui
+
+
+GameRecord = namedtuple('GameRecord', 'rows columns first_player winner_condition black_plane white_plane moves')
+
+ARCHIVE_MAGIC = b'OTHREC\x01\x00'
+RECORD_HEADER = struct.Struct('<BBBxH')
+INDEX_SUFFIX = '.idx'
+
+_WHITE_FIRST_FLAG = 1
+_FEWEST_WINS_FLAG = 2
+
+
+class InvalidArchiveError(Exception):
+    """Error for a file that is not a valid game archive or index."""
+    pass
+
+
+def _plane_size(rows: int, columns: int) -> int:
+    """Returns the number of bytes of one bit-packed board plane."""
+    return (rows * columns + 7) // 8
+
+
+def _pack_plane(board_state: [[int]], piece: int) -> bytes:
+    """Packs the squares of board_state holding piece into bytes, one bit per square in row order."""
+
+    bits = 0
+    index = 0
+    for row in board_state:
+        for square in row:
+            if square == piece:
+                bits |= 1 << index
+            index += 1
+    return bits.to_bytes(_plane_size(len(board_state), len(board_state[0])), 'little')
+
+
+def _map_file(file) -> tuple:
+    """Memory-maps the open file read-only. Returns a (mmap, memoryview of it) tuple, or (None, an empty
+    memoryview) for an empty file, which cannot be mapped."""
+
+    if os.fstat(file.fileno()).st_size == 0:
+        return None, memoryview(b'')
+    file_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return file_map, memoryview(file_map)
+
+
+def record_board_state(record: GameRecord) -> [[int]]:
+    """Unpacks the initial board of record into a list of lists board_state."""
+
+    black = int.from_bytes(record.black_plane, 'little')
+    white = int.from_bytes(record.white_plane, 'little')
+    board = []
+    index = 0
+    for row in range(record.rows):
+        sublist = []
+        for column in range(record.columns):
+            bit = 1 << index
+            sublist.append(1 if black & bit else -1 if white & bit else 0)
+            index += 1
+        board.append(sublist)
+    return board
+
+
+def record_moves(record: GameRecord) -> [tuple]:
+    """Returns the moves of record as a list of (row, column) tuples."""
+    return [(move >> 4, move & 15) for move in record.moves]
+
+
+def replay_record(record: GameRecord, plies: int = None) -> OthelloGame:
+    """Builds an OthelloGame at the initial position of record and plays its first plies moves (all of them by
+    default), letting is_game_over switch turns on passes exactly as the game did. Returns the game."""
+
+    game = OthelloGame()
+    game.BOARD_SIZE = (record.rows, record.columns)
+    game.WINNER_CONDITION = record.winner_condition
+    game.whose_turn = record.first_player
+    game.board_state = record_board_state(record)
+    for move in record.moves[:plies]:
+        game.is_game_over()
+        game.make_move((move >> 4, move & 15))
+    return game
+
+
+class GameRecordWriter:
+    """Appends game records to an archive file, writing the archive header if the file is new. Can also keep the
+    index of record offsets up to date when it is closed: the offsets of the records written are appended to an
+    index that covered the archive when it was opened, and the whole archive is scanned again otherwise."""
+
+    def __init__(self, path: str, write_index: bool = True):
+        """Opens the archive at path for appending."""
+
+        self._path = path
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(ARCHIVE_MAGIC)
+        self._write_index = write_index
+        self._index_current = write_index and _is_index_current(path, self._file.tell())
+        self._offsets = array('Q')
+        self.games = 0
+
+    def write_game(self, rows: int, columns: int, first_player: int, winner_condition: str,
+                   board_state: [[int]], moves: [tuple]) -> None:
+        """Appends one game: its board size, first player (1 or -1), winner condition ('>' or '<'), initial
+        board_state and the list of (row, column) moves played. Raises an InvalidBoardError if the board is
+        larger than 16x16 or does not match the size given."""
+
+        if not (16 >= rows >= 1 and 16 >= columns >= 1) or len(board_state) != rows \
+                or any(len(row) != columns for row in board_state):
+            raise InvalidBoardError('Invalid Board Size: Records hold boards up to 16x16 in size')
+        flags = (_WHITE_FIRST_FLAG if first_player == -1 else 0) | \
+                (_FEWEST_WINS_FLAG if winner_condition == '<' else 0)
+        self._offsets.append(self._file.tell())
+        self._file.write(RECORD_HEADER.pack(rows, columns, flags, len(moves)))
+        self._file.write(_pack_plane(board_state, 1))
+        self._file.write(_pack_plane(board_state, -1))
+        self._file.write(bytes((row << 4) | column for row, column in moves))
+        self.games += 1
+
+    def close(self) -> None:
+        """Closes the archive. If the writer keeps an index, brings it up to date so it covers the whole archive."""
+
+        self._file.close()
+        if self._index_current:
+            with open(self._path + INDEX_SUFFIX, 'ab') as index:
+                self._offsets.tofile(index)
+        elif self._write_index:
+            write_index(self._path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception_info):
+        self.close()
+
+
+class GameRecordReader:
+    """Memory-maps an archive and gives access to its records without reading the whole file. Iterating yields
+    every GameRecord in order; the planes and moves of each record are bytes copied out of the mapped file, so
+    records stay valid after the reader is closed. If an index file exists next to the archive, get(game_number)
+    jumps straight to a record. An empty archive or index file holds no records."""
+
+    def __init__(self, path: str):
+        """Maps the archive at path (and its index, if there is one). Raises an InvalidArchiveError if the file
+        does not start with the archive header."""
+
+        self._index_file = None
+        self._index_map = None
+        self._index = None
+        self._file = open(path, 'rb')
+        self._map, self._view = _map_file(self._file)
+        if len(self._view) > 0 and self._view[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+            self.close()
+            raise InvalidArchiveError('{} is not an Othello game archive'.format(path))
+
+        try:
+            self._index_file = open(path + INDEX_SUFFIX, 'rb')
+        except FileNotFoundError:
+            return
+        self._index_map, index_view = _map_file(self._index_file)
+        self._index = index_view.cast('Q')
+
+    def __iter__(self):
+        """Yields every record of the archive in order."""
+
+        offset = len(ARCHIVE_MAGIC)
+        end = len(self._view) if len(self._view) > 0 else offset
+        while offset < end:
+            record, offset = self._read_record(offset)
+            yield record
+
+    def __len__(self) -> int:
+        """Returns the number of records, using the index if there is one and counting them otherwise."""
+
+        if self._index is not None:
+            return len(self._index)
+        return sum(1 for record in self)
+
+    def get(self, game_number: int) -> GameRecord:
+        """Returns the record of game game_number (counting from 0). Uses the index for a direct jump, or scans
+        from the start of the archive if there is no index. Raises an IndexError if there is no such game."""
+
+        if self._index is not None:
+            return self._read_record(self._index[game_number])[0]
+        for number, record in enumerate(self):
+            if number == game_number:
+                return record
+        raise IndexError(game_number)
+
+    def close(self) -> None:
+        """Unmaps the archive and its index. Records handed out stay valid."""
+
+        if self._index is not None:
+            self._index.release()
+        if self._index_map is not None:
+            self._index_map.close()
+        if self._index_file is not None:
+            self._index_file.close()
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception_info):
+        self.close()
+
+    def _read_record(self, offset: int) -> tuple:
+        """Decodes the record starting at offset. Returns a (GameRecord, offset of the next record) tuple."""
+
+        try:
+            rows, columns, flags, move_count = RECORD_HEADER.unpack_from(self._view, offset)
+        except struct.error:
+            raise InvalidArchiveError('Truncated record header at offset {}'.format(offset))
+        plane_size = _plane_size(rows, columns)
+        planes = offset + RECORD_HEADER.size
+        moves = planes + 2 * plane_size
+        end = moves + move_count
+        if end > len(self._view):
+            raise InvalidArchiveError('Truncated record at offset {}'.format(offset))
+        record = GameRecord(rows, columns, -1 if flags & _WHITE_FIRST_FLAG else 1,
+                            '<' if flags & _FEWEST_WINS_FLAG else '>',
+                            self._map[planes:planes + plane_size], self._map[planes + plane_size:moves],
+                            self._map[moves:end])
+        return record, end
+
+
+def write_index(path: str) -> int:
+    """Scans the archive at path and writes the offset of every record to path + '.idx' as unsigned 64 bit ints.
+    Returns the number of records indexed."""
+
+    offsets = array('Q')
+    with open(path, 'rb') as archive:
+        archive_map, view = _map_file(archive)
+        try:
+            if len(view) > 0 and view[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+                raise InvalidArchiveError('{} is not an Othello game archive'.format(path))
+            offset = len(ARCHIVE_MAGIC)
+            while offset < len(view):
+                rows, columns, flags, move_count = RECORD_HEADER.unpack_from(view, offset)
+                offsets.append(offset)
+                offset += RECORD_HEADER.size + 2 * _plane_size(rows, columns) + move_count
+        finally:
+            view.release()
+            if archive_map is not None:
+                archive_map.close()
+    with open(path + INDEX_SUFFIX, 'wb') as index:
+        offsets.tofile(index)
+    return len(offsets)
+
+
+def _is_index_current(path: str, archive_size: int) -> bool:
+    """Returns True if the index of the archive at path exists and lists every record of its archive_size bytes:
+    its last offset must point at a record that ends exactly at the end of the archive."""
+
+    try:
+        with open(path + INDEX_SUFFIX, 'rb') as index:
+            index_size = index.seek(0, os.SEEK_END)
+            if index_size % 8 != 0:
+                return False
+            if index_size == 0:
+                return archive_size == len(ARCHIVE_MAGIC)
+            index.seek(index_size - 8)
+            last_offset = array('Q', index.read(8))[0]
+        with open(path, 'rb') as archive:
+            archive.seek(last_offset)
+            rows, columns, flags, move_count = RECORD_HEADER.unpack(archive.read(RECORD_HEADER.size))
+    except (FileNotFoundError, struct.error):
+        return False
+    return last_offset + RECORD_HEADER.size + 2 * _plane_size(rows, columns) + move_count == archive_size
+
+
+def convert_transcripts(input_stream, writer: GameRecordWriter) -> int:
+    """Reads games in the console FULL format from input_stream (as othello_ui --batch does), plays them and
+    writes the moves that stand at the end of each game to writer. Invalid move lines are dropped and UNDO/REDO
+    lines are applied. Returns the number of games written. Raises an EOFError if the stream ends in the middle
+    of a game, which is not written."""
+
+    lines = othello_ui.BatchLines(input_stream)
+    games = 0
+    while lines.has_next_game():
+        game = OthelloGame()
+        game.BOARD_SIZE = othello_ui.read_board_line_nums(lines.read_line)
+        game.whose_turn = first_player = othello_ui.read_first_player(lines.read_line)
+        game.WINNER_CONDITION = othello_ui.read_winner_condition(lines.read_line)
+        initial_board = othello_ui.read_board_initial_contents(game.BOARD_SIZE, lines.read_line)
+        game.board_state = [list(row) for row in initial_board]
+
+        moves = []
+        undone = []
+        while not game.is_game_over():
+            try:
+                move = othello_ui.read_move(lines.read_line)
+                if move == 'UNDO':
+                    game.undo()
+                    undone.append(moves.pop())
+                elif move == 'REDO':
+                    game.redo()
+                    moves.append(undone.pop())
+                else:
+                    moves.append(game.make_move(move).coordinates)
+                    undone = []
+            except InvalidMoveError:
+                pass
+        writer.write_game(game.BOARD_SIZE[0], game.BOARD_SIZE[1], first_player, game.WINNER_CONDITION,
+                          initial_board, moves)
+        games += 1
+    return games
+
+
+def main() -> None:
+    """Command line entry point: convert console transcripts to an archive, index an archive, or print the
+    final result of one game."""
+
+    parser = argparse.ArgumentParser(description='Compact binary Othello game archives.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help='convert FULL format transcripts into an archive')
+    convert.add_argument('transcripts', type=argparse.FileType('r'))
+    convert.add_argument('archive')
+    index = commands.add_parser('index', help='(re)build the index of an archive')
+    index.add_argument('archive')
+    show = commands.add_parser('show', help='replay one game of an archive and print its final result')
+    show.add_argument('archive')
+    show.add_argument('game_number', type=int)
+    arguments = parser.parse_args()
+
+    if arguments.command == 'convert':
+        error_message = None
+        with GameRecordWriter(arguments.archive) as writer:
+            try:
+                convert_transcripts(arguments.transcripts, writer)
+            except EOFError:
+                error_message = 'Game {} of the transcripts is incomplete: the input ended in the middle of it'.format(
+                    writer.games + 1)
+            except (ValueError, InvalidBoardError) as error:
+                error_message = 'Game {} of the transcripts is malformed: {}'.format(writer.games + 1, error)
+        print('{} games written'.format(writer.games))
+        if error_message is not None:
+            print(error_message, file=sys.stderr)
+            sys.exit(1)
+    elif arguments.command == 'index':
+        print('{} games indexed'.format(write_index(arguments.archive)))
+    else:
+        with GameRecordReader(arguments.archive) as reader:
+            record = reader.get(arguments.game_number)
+            game = replay_record(record)
+            moves = len(record.moves)
+        piece_counts = game.get_piece_counts()
+        game.is_game_over()
+        winner = {1: 'B', -1: 'W', None: 'NONE'}[game.get_winner()]
+        print('{} moves  B: {}  W: {}  WINNER: {}'.format(moves, piece_counts.black, piece_counts.white, winner))
+
+
+if __name__ == '__main__':
+    main()
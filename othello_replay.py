@@ -0,0 +1,182 @@
+# othello_replay.py
+# This program replays recorded Othello games and seeks to any ply of them quickly. A GameReplay holds the
+# initial position, the list of moves with the player who made each one, and a compact GameState snapshot of the
+# board every SNAPSHOT_INTERVAL plies. Seeking restores the nearest snapshot at or before the ply and plays the
+# remaining moves forward on a bare board along the shared ray tables, without validating them or maintaining
+# valid move sets: the moves were checked once, when they were added. The OthelloGame bookkeeping is then
+# rebuilt once for the position reached. The GUI's move scrubber and undo/redo are built on it.
+
+import argparse
+from collections import namedtuple
+
+from othello_logic import OthelloGame, GameState, InvalidMoveError, MoveRecord, get_ray_table
+
+
+ReplayMove = namedtuple('ReplayMove', 'coordinates player')
+
+SNAPSHOT_INTERVAL = 16
+
+
+class GameReplay:
+    """Move list of one game with periodic board snapshots. Moves are added with add_move (checked by playing
+    them on an OthelloGame) or record_move (taken from a game that already played them), and seek sets a game to
+    the position after any number of them."""
+
+    def __init__(self, initial_state: GameState, snapshot_interval: int = SNAPSHOT_INTERVAL):
+        """Initializes a replay of no moves from the position of initial_state, keeping a snapshot every
+        snapshot_interval plies."""
+
+        self.initial_state = initial_state.clone()
+        self.snapshot_interval = snapshot_interval
+        self.moves = []
+        self._snapshots = [self.initial_state]
+        self._game = None
+
+    @classmethod
+    def from_game(cls, game: OthelloGame, snapshot_interval: int = SNAPSHOT_INTERVAL) -> 'GameReplay':
+        """Returns a replay of no moves starting from the current position of game."""
+        return cls(game.get_state(), snapshot_interval)
+
+    @classmethod
+    def from_moves(cls, rows: int, columns: int, first_player: int, winner_condition: str, board_state: [[int]],
+                   moves: [tuple], snapshot_interval: int = SNAPSHOT_INTERVAL) -> 'GameReplay':
+        """Returns a replay of moves ((row, column) tuples) played from board_state with first_player to move,
+        letting is_game_over switch turns on passes exactly as the game did. Raises an InvalidMoveError if a move
+        is not valid where it is played."""
+
+        replay = cls(GameState.from_board_state(board_state, first_player, winner_condition), snapshot_interval)
+        for move in moves:
+            replay.add_move(move)
+        return replay
+
+    def __len__(self) -> int:
+        """Returns the number of moves (plies) in the replay."""
+        return len(self.moves)
+
+    def add_move(self, coordinates: tuple) -> ReplayMove:
+        """Checks that coordinates is a valid move in the position at the end of the replay (after any pass)
+        and adds it. Raises an InvalidMoveError if it is not. Returns the ReplayMove added."""
+
+        game = self._get_end_game()
+        game.is_game_over()
+        try:
+            record = game.make_move(coordinates)
+        except InvalidMoveError:
+            self._game = None
+            raise
+        self._add(record, game)
+        return self.moves[-1]
+
+    def record_move(self, game: OthelloGame, record: MoveRecord) -> None:
+        """Adds a move game has just played (its MoveRecord) without checking it again. game must be at the
+        position after the move, which must follow the last move of the replay."""
+
+        self._game = None
+        self._add(record, game)
+
+    def truncate(self, plies: int) -> None:
+        """Drops every move after the first plies, and the snapshots taken after them."""
+
+        del self.moves[plies:]
+        del self._snapshots[plies // self.snapshot_interval + 1:]
+        self._game = None
+
+    def get_turn(self, ply: int) -> int:
+        """Returns the player who moves at ply: the player of that move, or for the end of the replay the
+        opponent of the last mover. A pass at the end is left to is_game_over."""
+
+        if ply < len(self.moves):
+            return self.moves[ply].player
+        if len(self.moves) > 0:
+            return -self.moves[-1].player
+        return self.initial_state.whose_turn
+
+    def seek(self, ply: int, game: OthelloGame = None) -> OthelloGame:
+        """Sets game (a new OthelloGame if None) to the position after the first ply moves and returns it. The
+        nearest snapshot at or before ply is restored and at most snapshot_interval - 1 moves are played forward
+        on the bare board without validation; the piece counts, hash and valid move sets are then rebuilt once
+        and is_game_over settles whose turn it is. The game's undo history is cleared. Raises an IndexError if
+        ply is not between 0 and the number of moves."""
+
+        if not 0 <= ply <= len(self.moves):
+            raise IndexError('ply {} is not between 0 and {}'.format(ply, len(self.moves)))
+        if game is None:
+            game = OthelloGame()
+        snapshot_number = ply // self.snapshot_interval
+        board = self._snapshots[snapshot_number].board_state
+        rays = get_ray_table(self.initial_state.rows, self.initial_state.columns)
+        for coordinates, player in self.moves[snapshot_number * self.snapshot_interval:ply]:
+            _play_trusted_move(board, rays, coordinates, player)
+
+        game.BOARD_SIZE = (self.initial_state.rows, self.initial_state.columns)
+        game.WINNER_CONDITION = self.initial_state.winner_condition
+        game.whose_turn = self.get_turn(ply)
+        game.board_state = board
+        game.is_game_over()
+        return game
+
+    # PRIVATE FUNCTIONS #
+
+    def _add(self, record: MoveRecord, game: OthelloGame) -> None:
+        """Appends the move of record, and a snapshot of game if the replay has reached a snapshot ply."""
+
+        self.moves.append(ReplayMove(record.coordinates, record.player))
+        if len(self.moves) % self.snapshot_interval == 0:
+            self._snapshots.append(game.get_state())
+
+    def _get_end_game(self) -> OthelloGame:
+        """Returns the OthelloGame kept at the end of the replay for add_move, seeking to it if it was dropped."""
+
+        if self._game is None:
+            self._game = self.seek(len(self.moves))
+        return self._game
+
+
+# PRIVATE FUNCTIONS #
+
+def _play_trusted_move(board: [[int]], rays: [[tuple]], coordinates: tuple, player: int) -> None:
+    """Places player's piece on coordinates of a bare board_state and flips the pieces it flanks along the rays
+    of the ray table, as OthelloGame._get_flipped_pieces finds them. The move is trusted to be valid."""
+
+    row, column = coordinates
+    board[row][column] = player
+    for ray in rays[row][column]:
+        run = 0
+        for ray_row, ray_column in ray:
+            piece = board[ray_row][ray_column]
+            if piece == player:
+                for flip_row, flip_column in ray[:run]:
+                    board[flip_row][flip_column] = player
+                break
+            elif piece == 0:
+                break
+            run += 1
+
+
+def main() -> None:
+    """Seeks to one ply of one game of a record archive and prints the board there."""
+
+    import othello_records
+
+    parser = argparse.ArgumentParser(description='Print the board at any ply of an archived Othello game.')
+    parser.add_argument('archive')
+    parser.add_argument('game_number', type=int)
+    parser.add_argument('ply', type=int)
+    parser.add_argument('--snapshot-interval', type=int, default=SNAPSHOT_INTERVAL)
+    arguments = parser.parse_args()
+
+    with othello_records.GameRecordReader(arguments.archive) as reader:
+        record = reader.get(arguments.game_number)
+        replay = GameReplay.from_moves(record.rows, record.columns, record.first_player, record.winner_condition,
+                                       othello_records.record_board_state(record),
+                                       othello_records.record_moves(record), arguments.snapshot_interval)
+    game = replay.seek(arguments.ply)
+    piece_counts = game.get_piece_counts()
+    print('ply {} of {}  B: {}  W: {}  TURN: {}'.format(arguments.ply, len(replay), piece_counts.black,
+                                                        piece_counts.white, {1: 'B', -1: 'W'}[game.whose_turn]))
+    for row in game.board_state:
+        print(' '.join({0: '.', 1: 'B', -1: 'W'}[piece] for piece in row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+# othello_search.py
+# This program is the automated Othello opponent. It searches OthelloGame positions with negamax alpha-beta,
+# iterative deepening and move ordering, and stops at a hard wall-clock deadline so every move fits in a
+# time budget. Works for both the '>' and '<' winner conditions and any even board size the game allows.
+
+import threading
+import time
+from collections import namedtuple
+
+from othello_logic import OthelloGame
+
+
+SearchResult = namedtuple('SearchResult', 'move score depth nodes elapsed')
+TableEntry = namedtuple('TableEntry', 'key depth score flag move generation')
+TableStats = namedtuple('TableStats', 'capacity used hits misses stores replacements')
+
+DEFAULT_TIME_BUDGET = 0.5
+DEFAULT_TABLE_SIZE = 1 << 16
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+FINAL_SCORE_WEIGHT = 10000
+MOBILITY_WEIGHT = 5
+CORNER_WEIGHT = 25
+
+_square_priorities = {}
+
+
+class SearchTimeout(Exception):
+    """Error raised inside the search when the wall-clock deadline has passed."""
+    pass
+
+
+def copy_game(game: OthelloGame) -> OthelloGame:
+    """Returns a new OthelloGame with the same board size, winner condition, board_state and turn as game, so a
+    search can make and unmake moves without touching the game being played."""
+    return game.clone()
+
+
+def get_square_priorities(rows: int, columns: int) -> {tuple: int}:
+    """Returns a dictionary mapping every (row, column) of a board of the given size to an ordering priority
+    (lower is searched first): corners, then edges, then the interior, then the edge squares next to a corner
+    and last the squares diagonally next to a corner. Built once per board size."""
+
+    if (rows, columns) not in _square_priorities:
+        priorities = {}
+        for row in range(rows):
+            for column in range(columns):
+                on_row_edge = row in (0, rows - 1)
+                on_column_edge = column in (0, columns - 1)
+                near_row_edge = row in (1, rows - 2)
+                near_column_edge = column in (1, columns - 2)
+                if on_row_edge and on_column_edge:
+                    priority = 0
+                elif near_row_edge and near_column_edge:
+                    priority = 4
+                elif (on_row_edge and near_column_edge) or (on_column_edge and near_row_edge):
+                    priority = 3
+                elif on_row_edge or on_column_edge:
+                    priority = 1
+                else:
+                    priority = 2
+                priorities[(row, column)] = priority
+        _square_priorities[(rows, columns)] = priorities
+    return _square_priorities[(rows, columns)]
+
+
+class TranspositionTable:
+    """Fixed-capacity table of searched positions keyed by OthelloGame.get_position_hash(). Each hash maps to one
+    slot (hash modulo capacity), so memory use never grows however long the game. When two positions share a slot
+    the new one replaces the old one if the old one is from an earlier search or was searched no deeper.
+    Counts hits, misses, stores and replacements."""
+
+    def __init__(self, capacity: int = DEFAULT_TABLE_SIZE):
+        """Initializes an empty table with room for capacity entries."""
+
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._generation = 0
+        self._used = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self) -> None:
+        """Marks the start of a new search so entries from earlier searches are replaced first."""
+        self._generation += 1
+
+    def probe(self, key: int) -> TableEntry or None:
+        """Returns the TableEntry stored for key, or None if the position is not in the table."""
+
+        entry = self._slots[key % self.capacity]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: tuple) -> None:
+        """Stores the result of searching the position key to depth: its score, whether the score is EXACT, a
+        LOWER_BOUND or an UPPER_BOUND, and the best move found. Keeps the existing entry of a different position
+        if it is from this search and was searched deeper."""
+
+        index = key % self.capacity
+        entry = self._slots[index]
+        if entry is None:
+            self._used += 1
+        elif entry.key != key:
+            if entry.generation == self._generation and entry.depth > depth:
+                return
+            self.replacements += 1
+        self._slots[index] = TableEntry(key, depth, score, flag, move, self._generation)
+        self.stores += 1
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters."""
+
+        self._slots = [None] * self.capacity
+        self._used = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def get_stats(self) -> TableStats:
+        """Returns a TableStats namedtuple of the capacity, slots used, hits, misses, stores and replacements."""
+        return TableStats(self.capacity, self._used, self.hits, self.misses, self.stores, self.replacements)
+
+
+class SearchEngine:
+    """Negamax alpha-beta search over OthelloGame positions with iterative deepening. Each call to
+    find_best_move searches a private copy of the game until the time budget runs out and returns the best
+    move of the deepest fully searched iteration. Positions are cached in a TranspositionTable that is kept
+    between moves. Positions found in the opening book, if the engine has one, are answered without searching."""
+
+    def __init__(self, time_budget: float = DEFAULT_TIME_BUDGET, max_depth: int = None,
+                 table_size: int = DEFAULT_TABLE_SIZE, book=None):
+        """Initializes the engine with a time budget in seconds per move, an optional depth limit, the
+        number of transposition table entries and an optional othello_book.OpeningBook."""
+
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.book = book
+        self.table = TranspositionTable(table_size)
+        self._deadline = 0.0
+        self._stop_requested = threading.Event()
+        self._nodes = 0
+        self._game = None
+        self._priorities = {}
+        self._condition_sign = 1
+
+    def find_best_move(self, game: OthelloGame) -> SearchResult:
+        """Searches the position in game for the player whose_turn it is and returns a SearchResult of the best
+        move found, its score from that player's point of view, the depth reached, the number of nodes searched
+        and the time taken. The move is None if the player has no valid moves. A move from the opening book is
+        returned with depth 0."""
+
+        start = time.perf_counter()
+        self._deadline = start + self.time_budget
+        self._nodes = 0
+        self._game = copy_game(game)
+        self._priorities = get_square_priorities(len(game.board_state), len(game.board_state[0]))
+        self._condition_sign = 1 if game.WINNER_CONDITION == '>' else -1
+        self.table.new_search()
+
+        moves = self._ordered_moves(None)
+        if len(moves) == 0:
+            return SearchResult(None, 0, 0, 0, time.perf_counter() - start)
+        if len(moves) == 1:
+            return SearchResult(moves[0], 0, 0, 0, time.perf_counter() - start)
+        if self.book is not None:
+            entry = self.book.lookup(game)
+            if entry is not None:
+                return SearchResult(entry.move, entry.score, 0, 0, time.perf_counter() - start)
+
+        best_move = moves[0]
+        best_score = 0
+        depth_reached = 0
+        max_depth = self._game.get_piece_counts().empty
+        if self.max_depth is not None:
+            max_depth = min(max_depth, self.max_depth)
+
+        for depth in range(1, max_depth + 1):
+            try:
+                best_move, best_score = self._search_root(depth, best_move)
+            except SearchTimeout:
+                break
+            depth_reached = depth
+            if abs(best_score) >= FINAL_SCORE_WEIGHT:
+                break
+
+        return SearchResult(best_move, best_score, depth_reached, self._nodes, time.perf_counter() - start)
+
+    def stop(self) -> None:
+        """Ends a find_best_move running on another thread at its next node, as if its time budget had run out.
+        That call returns the best move of the deepest iteration it completed. A stop that arrives before the
+        search starts is kept, so that search returns at once; every search stops until clear_stop is called."""
+        self._stop_requested.set()
+
+    def clear_stop(self) -> None:
+        """Lets find_best_move search for its full time budget again after a stop. find_best_move never clears
+        it itself, so the caller clears it before starting a search that has not been cancelled."""
+        self._stop_requested.clear()
+
+    # PRIVATE FUNCTIONS #
+
+    def _search_root(self, depth: int, previous_best: tuple) -> tuple:
+        """Searches every root move to the given depth, trying the previous iteration's best move first.
+        Returns a (move, score) tuple. Raises SearchTimeout if the deadline passes."""
+
+        game = self._game
+        alpha = -FINAL_SCORE_WEIGHT * 1000
+        beta = -alpha
+        best_move = previous_best
+        for move in self._ordered_moves(previous_best):
+            record = game.make_move(move)
+            try:
+                score = -self._negamax(depth - 1, -beta, -alpha, False)
+            finally:
+                game.unmake_move(record)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        self.table.store(game.get_position_hash(), depth, alpha, EXACT, best_move)
+        return best_move, alpha
+
+    def _negamax(self, depth: int, alpha: int, beta: int, passed: bool) -> int:
+        """Returns the negamax alpha-beta score of the position for the player whose_turn it is. A player with
+        no valid moves passes without using up depth; two passes in a row end the game. Searched positions are
+        looked up in and stored to the transposition table."""
+
+        self._nodes += 1
+        if time.perf_counter() > self._deadline or self._stop_requested.is_set():
+            raise SearchTimeout
+
+        game = self._game
+        if game.count_valid_moves() == 0:
+            if passed:
+                return self._final_score()
+            game.whose_turn *= -1
+            try:
+                return -self._negamax(depth, -beta, -alpha, True)
+            finally:
+                game.whose_turn *= -1
+
+        if depth == 0:
+            return self._evaluate()
+
+        key = game.get_position_hash()
+        entry = self.table.probe(key)
+        table_move = None
+        if entry is not None:
+            table_move = entry.move
+            if entry.depth >= depth:
+                if entry.flag == EXACT:
+                    return entry.score
+                elif entry.flag == LOWER_BOUND:
+                    alpha = max(alpha, entry.score)
+                else:
+                    beta = min(beta, entry.score)
+                if alpha >= beta:
+                    return entry.score
+
+        original_alpha = alpha
+        best_score = -FINAL_SCORE_WEIGHT * 1000
+        best_move = None
+        for move in self._ordered_moves(table_move):
+            record = game.make_move(move)
+            try:
+                score = -self._negamax(depth - 1, -beta, -alpha, False)
+            finally:
+                game.unmake_move(record)
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.table.store(key, depth, best_score, flag, best_move)
+        return best_score
+
+    def _ordered_moves(self, first_move: tuple) -> [tuple]:
+        """Returns the valid moves of the current player ordered by square priority, with first_move (if it is
+        one of them) moved to the front."""
+
+        moves = self._game.get_valid_moves()
+        moves.sort(key=self._priorities.__getitem__)
+        if first_move in moves:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+        return moves
+
+    def _disc_difference(self) -> int:
+        """Returns the current player's discs minus the opponent's discs."""
+
+        piece_counts = self._game.get_piece_counts()
+        if self._game.whose_turn == 1:
+            return piece_counts.black - piece_counts.white
+        return piece_counts.white - piece_counts.black
+
+    def _final_score(self) -> int:
+        """Returns the score of a finished game for the current player: the disc difference under the winner
+        condition, scaled so any win outranks every heuristic evaluation."""
+
+        difference = self._disc_difference() * self._condition_sign
+        if difference > 0:
+            return FINAL_SCORE_WEIGHT + difference
+        elif difference < 0:
+            return -FINAL_SCORE_WEIGHT + difference
+        return 0
+
+    def _evaluate(self) -> int:
+        """Returns the heuristic score of an unfinished position for the current player. Mobility is always
+        good; corners and discs count for the player under '>' and against them under '<'."""
+
+        game = self._game
+        player = game.whose_turn
+        board = game.board_state
+        corners = 0
+        for row in (0, len(board) - 1):
+            for column in (0, len(board[0]) - 1):
+                corners += board[row][column] * player
+
+        mobility = game.count_valid_moves(player) - game.count_valid_moves(-player)
+        return (MOBILITY_WEIGHT * mobility
+                + self._condition_sign * (CORNER_WEIGHT * corners + self._disc_difference()))
@@ -0,0 +1,509 @@
+# othello_server.py
+# This program is the Othello evaluation server. It keeps one warm search engine (transposition table and opening
+# book) and answers positions sent by any number of front ends over a local TCP or Unix socket, so the console
+# game, the GUI and scripts can share it. Requests and responses are single lines of JSON. Requests that arrive
+# together are evaluated as one batch on the engine thread: identical positions are evaluated once, and legal move,
+# piece count and winner queries on boards of one size go through one othello_batch call when NumPy is installed.
+# The request queue is bounded, so a client that sends faster than the engine answers stops being read until the
+# queue drains. The EvaluationClient and RemoteSearchEngine classes at the bottom are the client side.
+#
+# A request looks like {"id": 7, "op": "best_move", "board": [[0, 0, ...], ...], "turn": 1,
+# "winner_condition": ">", "time_budget": 0.5} and is answered by {"id": 7, "ok": true, "result": {...}}, or by
+# {"id": 7, "ok": false, "error": "..."}. The ops are legal_moves, counts, winner, best_move and stats.
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import math
+import os
+import socket
+import time
+from collections import deque, namedtuple
+
+from othello_logic import OthelloGame, InvalidBoardError, PieceCounts
+import othello_book
+import othello_search
+
+try:
+    import othello_batch
+except ImportError:
+    othello_batch = None
+
+
+GameOutcome = namedtuple('GameOutcome', 'game_over winner')
+ServerStats = namedtuple('ServerStats', 'requests batches mean_batch_size queued p50_ms p90_ms p99_ms max_ms')
+
+DEFAULT_ADDRESS = '127.0.0.1:47474'
+SERVER_ENVIRONMENT_VARIABLE = 'OTHELLO_SERVER'
+DEFAULT_MAX_PENDING = 256
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_MAX_TIME_BUDGET = 10.0
+CONNECT_TIMEOUT = 0.5
+RESPONSE_TIMEOUT_MARGIN = 2.0
+LATENCY_SAMPLES = 10000
+QUERY_OPS = ('legal_moves', 'counts', 'winner')
+POSITION_OPS = QUERY_OPS + ('best_move',)
+
+_clients = {}
+
+
+class EvaluationError(Exception):
+    """Error raised by EvaluationClient when the server rejects a request."""
+    pass
+
+
+class EvaluationServer:
+    """Asyncio server evaluating Othello positions with one shared SearchEngine. Each connection is read by its
+    own task, which parses request lines and puts them on a bounded queue; a single batching task takes every
+    request waiting on the queue (up to batch_size) and evaluates them together on the engine thread. Responses
+    are written back to each connection in the order its requests arrived."""
+
+    def __init__(self, max_time_budget: float = DEFAULT_MAX_TIME_BUDGET, max_pending: int = DEFAULT_MAX_PENDING,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        """Initializes the server. A best_move request may search for at most max_time_budget seconds; at most
+        max_pending requests wait for the engine before the connections sending more stop being read."""
+
+        self.max_time_budget = max_time_budget
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.requests = 0
+        self.batches = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._search_engine = othello_search.SearchEngine(max_time_budget, book=othello_book.get_default_book())
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._queue = None
+
+    async def serve(self, address: str) -> None:
+        """Listens on address ("host:port" for TCP, anything else is a Unix socket path) until cancelled."""
+
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        target = parse_address(address)
+        if isinstance(target, tuple):
+            server = await asyncio.start_server(self._handle_connection, target[0], target[1])
+        else:
+            if os.path.exists(target):
+                os.unlink(target)
+            server = await asyncio.start_unix_server(self._handle_connection, target)
+        batcher = asyncio.create_task(self._run_batches())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> ServerStats:
+        """Returns a ServerStats namedtuple of the requests answered, the batches evaluated and their mean size,
+        the requests waiting now and the 50th, 90th and 99th percentile and maximum latency in milliseconds of
+        the most recent requests (from reading the request to writing its response)."""
+
+        latencies = sorted(self._latencies)
+        percentiles = [latencies[min(len(latencies) - 1, (len(latencies) * percent - 1) // 100)] * 1000
+                       if latencies else 0.0 for percent in (50, 90, 99)]
+        return ServerStats(self.requests, self.batches, self.requests / max(self.batches, 1),
+                           self._queue.qsize() if self._queue is not None else 0, *percentiles,
+                           latencies[-1] * 1000 if latencies else 0.0)
+
+    # PRIVATE FUNCTIONS #
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Reads the request lines of one connection and queues them, waiting while the queue is full. A second
+        task writes the responses back in order as their futures complete."""
+
+        loop = asyncio.get_running_loop()
+        responses = asyncio.Queue()
+        responder = asyncio.create_task(self._write_responses(writer, responses))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                future = loop.create_future()
+                await responses.put((future, start))
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('a request must be a JSON object')
+                except ValueError as error:
+                    future.set_result({'id': None, 'ok': False, 'error': str(error)})
+                    continue
+                if request.get('op') == 'stats':
+                    future.set_result({'id': request.get('id'), 'ok': True, 'result': self.get_stats()._asdict()})
+                    continue
+                await self._queue.put((request, future))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            await responses.put(None)
+            await responder
+
+    async def _write_responses(self, writer: asyncio.StreamWriter, responses: asyncio.Queue) -> None:
+        """Writes the response of each queued future to writer in order and records its latency, until a None
+        is queued. Waits for the connection to drain after every response."""
+
+        try:
+            while True:
+                item = await responses.get()
+                if item is None:
+                    break
+                future, start = item
+                response = await future
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+                self.requests += 1
+                self._latencies.append(time.perf_counter() - start)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _run_batches(self) -> None:
+        """Takes every request waiting on the queue (at least one, at most batch_size), evaluates them together
+        on the engine thread and completes their futures, forever."""
+
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            requests = [request for request, future in batch]
+            try:
+                responses = await loop.run_in_executor(self._executor, self._evaluate_batch, requests)
+            except Exception as error:
+                responses = [{'id': request.get('id'), 'ok': False, 'error': repr(error)} for request in requests]
+            self.batches += 1
+            for (request, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    def _evaluate_batch(self, requests: [dict]) -> [dict]:
+        """Evaluates a batch of requests on the engine thread. Returns their responses in the same order."""
+
+        responses = [None] * len(requests)
+        results = {}
+        queries = {}
+        for index, request in enumerate(requests):
+            try:
+                op = request.get('op')
+                if op not in POSITION_OPS:
+                    raise EvaluationError('unknown op {!r}'.format(op))
+                game = _read_position(request)
+                if op == 'best_move':
+                    time_budget = min(_read_time_budget(request), self.max_time_budget)
+            except (EvaluationError, InvalidBoardError) as error:
+                responses[index] = {'id': request.get('id'), 'ok': False, 'error': str(error)}
+                continue
+            if op == 'best_move':
+                key = (op, game.get_position_hash(), time_budget)
+                if key not in results:
+                    self._search_engine.time_budget = time_budget
+                    results[key] = _format_search_result(self._search_engine.find_best_move(game))
+            else:
+                key = (op, game.get_position_hash())
+                queries.setdefault(game.BOARD_SIZE, {}).setdefault(key, (op, game))
+            responses[index] = key
+
+        for size_queries in queries.values():
+            results.update(_evaluate_queries(size_queries))
+        return [response if isinstance(response, dict) else
+                {'id': request.get('id'), 'ok': True, 'result': results[response]}
+                for request, response in zip(requests, responses)]
+
+
+class EvaluationClient:
+    """Blocking client of an EvaluationServer. Each call sends one request and waits for its response, so one
+    client must not be used by two threads at once."""
+
+    def __init__(self, address: str, timeout: float = None):
+        """Connects to the server at address ("host:port" or a Unix socket path). Raises an OSError if no server
+        is listening there. timeout bounds every socket operation (None waits forever)."""
+
+        target = parse_address(address)
+        if isinstance(target, tuple):
+            self._socket = socket.create_connection(target, timeout=CONNECT_TIMEOUT)
+        else:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(CONNECT_TIMEOUT)
+            self._socket.connect(target)
+        self._socket.settimeout(timeout)
+        self._file = self._socket.makefile('rwb')
+        self._next_id = 0
+
+    def get_legal_moves(self, game: OthelloGame) -> [tuple]:
+        """Returns the valid moves of the player to move in game in board order, like game.get_valid_moves()."""
+        return [tuple(move) for move in self._request('legal_moves', game)['moves']]
+
+    def get_piece_counts(self, game: OthelloGame) -> PieceCounts:
+        """Returns the PieceCounts of the board of game."""
+
+        counts = self._request('counts', game)
+        return PieceCounts(counts['empty'], counts['black'], counts['white'])
+
+    def get_outcome(self, game: OthelloGame) -> GameOutcome:
+        """Returns a GameOutcome of whether neither player can move in game (or the board is full) and who leads
+        under its winner condition (1 black, -1 white, None for a tie)."""
+
+        outcome = self._request('winner', game)
+        return GameOutcome(outcome['game_over'], outcome['winner'])
+
+    def find_best_move(self, game: OthelloGame, time_budget: float) -> othello_search.SearchResult:
+        """Asks the server's engine to search game for at most time_budget seconds (the server may cap it).
+        Returns its SearchResult. Raises an EvaluationError if the result is malformed."""
+
+        result = self._request('best_move', game, time_budget=time_budget)
+        try:
+            move = tuple(result['move']) if result['move'] is not None else None
+            return othello_search.SearchResult(move, result['score'], result['depth'], result['nodes'],
+                                               result['elapsed'])
+        except (KeyError, TypeError, ValueError):
+            raise EvaluationError('malformed best_move result {!r}'.format(result))
+
+    def get_stats(self) -> ServerStats:
+        """Returns the server's ServerStats."""
+        return ServerStats(**self._send({'op': 'stats'}))
+
+    def close(self) -> None:
+        """Closes the connection."""
+
+        self._file.close()
+        self._socket.close()
+
+    # PRIVATE FUNCTIONS #
+
+    def _request(self, op: str, game: OthelloGame, **fields) -> dict:
+        """Sends a request of op about the position in game with any extra fields and returns its result."""
+
+        request = {'op': op, 'board': game.board_state, 'turn': game.whose_turn,
+                   'winner_condition': game.WINNER_CONDITION}
+        request.update(fields)
+        return self._send(request)
+
+    def _send(self, request: dict) -> dict:
+        """Sends request with the next id, reads its response and returns its result. Raises an EvaluationError
+        if the server rejects it or the response is malformed, a ConnectionError if the server closed the
+        connection, or a socket.timeout (an OSError) if it does not answer within the client's timeout."""
+
+        self._next_id += 1
+        request['id'] = self._next_id
+        self._file.write(json.dumps(request).encode() + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('the evaluation server closed the connection')
+        try:
+            response = json.loads(line)
+            ok = response['ok']
+            result = response['result'] if ok else response['error']
+        except (ValueError, KeyError, TypeError):
+            raise EvaluationError('malformed response {!r}'.format(line))
+        if not ok:
+            raise EvaluationError(result)
+        return result
+
+
+class RemoteSearchEngine:
+    """Stand-in for othello_search.SearchEngine that asks an evaluation server for moves. If the server goes away,
+    stops answering in time or sends an error or malformed response, the connection is dropped and a local
+    SearchEngine is used for the rest of the game."""
+
+    def __init__(self, client: EvaluationClient, time_budget: float = othello_search.DEFAULT_TIME_BUDGET):
+        """Initializes the engine to ask client for moves searched for time_budget seconds."""
+
+        self.client = client
+        self.time_budget = time_budget
+        self._local_engine = None
+
+    def find_best_move(self, game: OthelloGame) -> othello_search.SearchResult:
+        """Returns the SearchResult of the server's search of game, or of a local search if the server cannot
+        be reached or does not answer properly."""
+
+        if self._local_engine is None:
+            try:
+                return self.client.find_best_move(game, self.time_budget)
+            except (OSError, EvaluationError):
+                _forget_client(self.client)
+                self._local_engine = othello_search.SearchEngine(self.time_budget,
+                                                                 book=othello_book.get_default_book())
+        return self._local_engine.find_best_move(game)
+
+    def stop(self) -> None:
+        """Stops a local search early. A search on the server always ends within its time budget."""
+
+        if self._local_engine is not None:
+            self._local_engine.stop()
+
+    def clear_stop(self) -> None:
+        """Lets a local search run for its full time budget again after a stop."""
+
+        if self._local_engine is not None:
+            self._local_engine.clear_stop()
+
+
+def parse_address(address: str) -> tuple or str:
+    """Converts a "host:port" address into a (host, port) tuple. Any other address is a Unix socket path and is
+    returned as it is."""
+
+    host, separator, port = address.rpartition(':')
+    if separator and host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def connect(address: str = None, timeout: float = None) -> EvaluationClient or None:
+    """Returns a shared EvaluationClient for the server at address (the OTHELLO_SERVER environment variable by
+    default), or None if no address is given or no server answers there. timeout bounds the wait for each
+    response (None waits forever)."""
+
+    if address is None:
+        address = os.environ.get(SERVER_ENVIRONMENT_VARIABLE)
+    if not address:
+        return None
+    key = (address, timeout)
+    if key not in _clients:
+        try:
+            _clients[key] = EvaluationClient(address, timeout)
+        except OSError:
+            return None
+    return _clients[key]
+
+
+def get_search_engine(time_budget: float, address: str = None):
+    """Returns a RemoteSearchEngine using the evaluation server at address (or OTHELLO_SERVER) if one is running,
+    otherwise a local SearchEngine with the default opening book. Both have find_best_move, stop and clear_stop.
+    A server that takes more than RESPONSE_TIMEOUT_MARGIN seconds longer than time_budget to answer is treated
+    as gone."""
+
+    client = connect(address, time_budget + RESPONSE_TIMEOUT_MARGIN)
+    if client is not None:
+        return RemoteSearchEngine(client, time_budget)
+    return othello_search.SearchEngine(time_budget, book=othello_book.get_default_book())
+
+
+# PRIVATE FUNCTIONS #
+
+def _forget_client(client: EvaluationClient) -> None:
+    """Closes a shared client whose connection failed or fell out of step and drops it, so connect makes a new
+    one next time."""
+
+    for key, shared_client in list(_clients.items()):
+        if shared_client is client:
+            del _clients[key]
+    try:
+        client.close()
+    except OSError:
+        pass
+
+
+def _read_position(request: dict) -> OthelloGame:
+    """Builds an OthelloGame from the board, turn and winner_condition of a request. Raises an InvalidBoardError
+    if any of them is malformed."""
+
+    board = request.get('board')
+    if not isinstance(board, list) or not all(isinstance(row, list) for row in board) or len(board) == 0:
+        raise InvalidBoardError('board must be a list of rows')
+    rows = len(board)
+    columns = len(board[0])
+    if not (16 >= rows >= 4 and rows % 2 == 0 and 16 >= columns >= 4 and columns % 2 == 0):
+        raise InvalidBoardError('Invalid Board Size: Must be even and between 4x4 and 16x16 in size')
+    if any(len(row) != columns or any(piece not in (0, 1, -1) for piece in row) for row in board):
+        raise InvalidBoardError('Invalid Initial Board Piece given.')
+    if request.get('turn') not in (1, -1) or request.get('winner_condition') not in ('>', '<'):
+        raise InvalidBoardError('turn must be 1 or -1 and winner_condition > or <')
+
+    game = OthelloGame()
+    game.BOARD_SIZE = (rows, columns)
+    game.WINNER_CONDITION = request['winner_condition']
+    game.whose_turn = request['turn']
+    game.board_state = [[int(piece) for piece in row] for row in board]
+    return game
+
+
+def _read_time_budget(request: dict) -> float:
+    """Returns the time_budget of a best_move request in seconds (DEFAULT_TIME_BUDGET if it has none). Raises an
+    EvaluationError if it is not a finite number of at least 0."""
+
+    try:
+        time_budget = float(request.get('time_budget', othello_search.DEFAULT_TIME_BUDGET))
+    except (TypeError, ValueError):
+        raise EvaluationError('time_budget must be a number of seconds')
+    if not math.isfinite(time_budget) or time_budget < 0:
+        raise EvaluationError('time_budget must be a finite number of seconds of at least 0')
+    return time_budget
+
+
+def _format_search_result(result: othello_search.SearchResult) -> dict:
+    """Returns the JSON result of a best_move request from a SearchResult."""
+
+    return {'move': list(result.move) if result.move is not None else None, 'score': result.score,
+            'depth': result.depth, 'nodes': result.nodes, 'elapsed': result.elapsed}
+
+
+def _evaluate_queries(queries: {tuple: tuple}) -> {tuple: dict}:
+    """Takes in a dictionary of result key to (op, game) for distinct legal_moves, counts and winner queries on
+    boards of one size. Returns a dictionary of result key to JSON result, computed with one othello_batch call
+    when NumPy is installed and there is more than one board, and with each OthelloGame otherwise."""
+
+    if othello_batch is None or len(queries) == 1:
+        return {key: _evaluate_query(op, game) for key, (op, game) in queries.items()}
+
+    keys = list(queries)
+    games = [queries[key][1] for key in keys]
+    boards, to_move = othello_batch.stack_games(games)
+    legal_moves = othello_batch.get_legal_moves(boards, to_move)
+    opponent_moves = othello_batch.get_legal_moves(boards, -to_move)
+    piece_counts = othello_batch.get_piece_counts(boards)
+    winners = othello_batch.get_winners(boards, [game.WINNER_CONDITION for game in games])
+    results = {}
+    for index, key in enumerate(keys):
+        op = queries[key][0]
+        if op == 'legal_moves':
+            rows, columns = legal_moves[index].nonzero()
+            results[key] = {'moves': [[int(row), int(column)] for row, column in zip(rows, columns)]}
+        elif op == 'counts':
+            results[key] = {'empty': int(piece_counts.empty[index]), 'black': int(piece_counts.black[index]),
+                            'white': int(piece_counts.white[index])}
+        else:
+            game_over = bool(piece_counts.empty[index] == 0 or not (legal_moves[index].any() or
+                                                                   opponent_moves[index].any()))
+            results[key] = {'game_over': game_over, 'winner': int(winners[index]) or None}
+    return results
+
+
+def _evaluate_query(op: str, game: OthelloGame) -> dict:
+    """Returns the JSON result of one legal_moves, counts or winner query on game."""
+
+    if op == 'legal_moves':
+        return {'moves': [list(move) for move in game.get_valid_moves()]}
+    if op == 'counts':
+        return game.get_piece_counts()._asdict()
+    game_over = (game.get_piece_counts().empty == 0 or
+                 (game.count_valid_moves(1) == 0 and game.count_valid_moves(-1) == 0))
+    return {'game_over': game_over, 'winner': game.get_winner()}
+
+
+def main() -> None:
+    """Runs the evaluation server until it is interrupted, then prints its stats."""
+
+    parser = argparse.ArgumentParser(description='Serve Othello position evaluations over a local socket.')
+    parser.add_argument('--address', default=os.environ.get(SERVER_ENVIRONMENT_VARIABLE) or DEFAULT_ADDRESS,
+                        help='host:port to listen on, or the path of a Unix socket')
+    parser.add_argument('--max-time-budget', type=float, default=DEFAULT_MAX_TIME_BUDGET,
+                        help='longest search in seconds a best_move request may ask for')
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help='requests that may wait for the engine before clients stop being read')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    arguments = parser.parse_args()
+
+    server = EvaluationServer(arguments.max_time_budget, arguments.max_pending, arguments.batch_size)
+    print('Serving Othello evaluations on {}'.format(arguments.address))
+    try:
+        asyncio.run(server.serve(arguments.address))
+    except KeyboardInterrupt:
+        pass
+    print(server.get_stats())
+
+
+if __name__ == '__main__':
+    main()
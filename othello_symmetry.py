@@ -0,0 +1,115 @@
+# othello_symmetry.py
+# This program maps Othello positions to symmetry-canonical keys. A square board has 8 symmetries (4 rotations
+# and 4 reflections) and a rectangular board has 4 (identity, the two mirror flips and the half turn); the
+# rotations by a quarter turn and the diagonal reflections of a rectangle change its shape, so they are not used.
+# The canonical key of a position is the smallest Zobrist hash of the board over its symmetries, combined with the
+# side to move (and winner condition), so all symmetric copies of a position share one key.
+
+import functools
+import itertools
+import operator
+from collections import namedtuple
+
+from othello_logic import OthelloGame, get_zobrist_keys
+
+
+Transform = namedtuple('Transform', 'transpose flip_rows flip_columns')
+CanonicalKey = namedtuple('CanonicalKey', 'key transform')
+
+# A transform transposes the board first (square boards only), then flips its rows, then its columns.
+SQUARE_TRANSFORMS = tuple(Transform(transpose, flip_rows, flip_columns) for transpose in (False, True)
+                          for flip_rows in (False, True) for flip_columns in (False, True))
+RECTANGLE_TRANSFORMS = tuple(transform for transform in SQUARE_TRANSFORMS if not transform.transpose)
+
+_symmetry_tables = {}
+
+
+def get_transforms(rows: int, columns: int) -> tuple:
+    """Returns the symmetry transforms of a board of the given size: 8 for a square board, 4 otherwise."""
+    return SQUARE_TRANSFORMS if rows == columns else RECTANGLE_TRANSFORMS
+
+
+def transform_square(transform: Transform, coordinates: tuple, rows: int, columns: int) -> tuple:
+    """Takes in a transform and a (row, column) square of a rows x columns board. Returns the square it is moved
+    to."""
+
+    row, column = coordinates
+    if transform.transpose:
+        row, column = column, row
+    if transform.flip_rows:
+        row = rows - 1 - row
+    if transform.flip_columns:
+        column = columns - 1 - column
+    return row, column
+
+
+def untransform_square(transform: Transform, coordinates: tuple, rows: int, columns: int) -> tuple:
+    """Returns the square that transform_square moves to coordinates (the inverse transform)."""
+
+    row, column = coordinates
+    if transform.flip_rows:
+        row = rows - 1 - row
+    if transform.flip_columns:
+        column = columns - 1 - column
+    if transform.transpose:
+        row, column = column, row
+    return row, column
+
+
+def transform_board(transform: Transform, board_state: [[int]]) -> [[int]]:
+    """Returns a new board_state with every piece of board_state moved by transform."""
+
+    rows = len(board_state)
+    columns = len(board_state[0])
+    board = [[0] * columns for row in range(rows)]
+    for row in range(rows):
+        for column in range(columns):
+            new_row, new_column = transform_square(transform, (row, column), rows, columns)
+            board[new_row][new_column] = board_state[row][column]
+    return board
+
+
+def _get_symmetry_tables(rows: int, columns: int) -> tuple:
+    """Returns, for each symmetry transform of the board size, a flat list of Zobrist keys: index
+    row * columns + column holds the black key of the square that square is moved to, and the same index plus
+    rows * columns its white key. Built once per board size."""
+
+    if (rows, columns) not in _symmetry_tables:
+        squares = get_zobrist_keys(rows, columns).squares
+        tables = []
+        for transform in get_transforms(rows, columns):
+            moved = [transform_square(transform, (row, column), rows, columns)
+                     for row in range(rows) for column in range(columns)]
+            tables.append([squares[piece][row][column] for piece in (1, -1) for row, column in moved])
+        _symmetry_tables[(rows, columns)] = tuple(tables)
+    return _symmetry_tables[(rows, columns)]
+
+
+def canonicalize(board_state: [[int]], player: int, winner_condition: str = None) -> CanonicalKey:
+    """Takes in a board_state, the player to move and optionally the winner condition. Returns a CanonicalKey of
+    the position's canonical key and the transform that gives it: the same key for every rotation and reflection
+    of the position that keeps the board's shape. A move m of the position is stored under the key as
+    transform_square(transform, m, rows, columns) and read back with untransform_square."""
+
+    rows = len(board_state)
+    columns = len(board_state[0])
+    keys = get_zobrist_keys(rows, columns)
+    size = rows * columns
+    occupied = [index if piece == 1 else index + size
+                for index, piece in enumerate(itertools.chain.from_iterable(board_state)) if piece != 0]
+
+    best_hash = None
+    best_index = 0
+    for index, table in enumerate(_get_symmetry_tables(rows, columns)):
+        board_hash = functools.reduce(operator.xor, map(table.__getitem__, occupied), 0)
+        if best_hash is None or board_hash < best_hash:
+            best_hash = board_hash
+            best_index = index
+
+    extra = keys.size ^ keys.side.get(player, 0) ^ keys.condition.get(winner_condition, 0)
+    return CanonicalKey(best_hash ^ extra, get_transforms(rows, columns)[best_index])
+
+
+def get_canonical_key(game: OthelloGame) -> CanonicalKey:
+    """Returns the CanonicalKey of the position in game, including its side to move and winner condition."""
+    return canonicalize(game.board_state, game.whose_turn, game.WINNER_CONDITION)
@@ -0,0 +1,263 @@
+# othello_tournament.py
+# This program plays headless self-play tournaments of the Othello Game across a process pool. It takes a matrix
+# of board sizes, starting layouts, first players, winner conditions and player strategies, streams one JSON line
+# per finished game and prints an aggregated report. Every game gets its own seed derived from the tournament
+# seed, so a tournament replays identically whatever the number of processes.
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import namedtuple
+
+from othello_logic import OthelloGame, START_LAYOUTS, build_start_board
+import othello_book
+import othello_search
+
+
+GameSpec = namedtuple('GameSpec', 'game_id rows columns layout first_player winner_condition '
+                                  'black_strategy white_strategy seed search_depth book_path')
+GameResult = namedtuple('GameResult', 'game_id rows columns layout first_player winner_condition '
+                                      'black_strategy white_strategy seed winner black white moves '
+                                      'mean_move_time max_move_time')
+
+STRATEGIES = ('random', 'greedy', 'search')
+DEFAULT_SEARCH_DEPTH = 2
+
+
+class RandomPlayer:
+    """Plays a uniformly random valid move."""
+
+    def __init__(self, rng: random.Random, search_depth: int, book: othello_book.OpeningBook = None):
+        """Initializes the player with the game's random number generator."""
+        self._rng = rng
+
+    def choose_move(self, game: OthelloGame) -> tuple:
+        """Returns a random valid move for the current player."""
+        return self._rng.choice(game.get_valid_moves())
+
+
+class GreedyPlayer:
+    """Plays the valid move that flips the most discs under '>' or the fewest under '<', breaking ties randomly."""
+
+    def __init__(self, rng: random.Random, search_depth: int, book: othello_book.OpeningBook = None):
+        """Initializes the player with the game's random number generator."""
+        self._rng = rng
+
+    def choose_move(self, game: OthelloGame) -> tuple:
+        """Counts the flips of every valid move with get_flip_counts and returns the one with the best count."""
+
+        sign = 1 if game.WINNER_CONDITION == '>' else -1
+        best_moves = []
+        best_flips = None
+        flip_counts = game.get_flip_counts()
+        for move in game.iter_valid_moves():
+            flips = sign * flip_counts[move]
+            if best_flips is None or flips > best_flips:
+                best_flips = flips
+                best_moves = [move]
+            elif flips == best_flips:
+                best_moves.append(move)
+        return self._rng.choice(best_moves)
+
+
+class SearchPlayer:
+    """Plays the move chosen by the othello_search engine searching to a fixed depth. The depth limit, not a time
+    budget, bounds the search so results are reproducible. In-book positions are answered from the opening book
+    if the tournament has one."""
+
+    def __init__(self, rng: random.Random, search_depth: int, book: othello_book.OpeningBook = None):
+        """Initializes a search engine limited to search_depth plies that uses book."""
+        self._engine = othello_search.SearchEngine(time_budget=float('inf'), max_depth=search_depth, book=book)
+
+    def choose_move(self, game: OthelloGame) -> tuple:
+        """Returns the search engine's best move for the current player."""
+        return self._engine.find_best_move(game).move
+
+
+PLAYER_CLASSES = {'random': RandomPlayer, 'greedy': GreedyPlayer, 'search': SearchPlayer}
+
+_books = {}
+
+
+def _get_book(path: str) -> othello_book.OpeningBook or None:
+    """Returns the OpeningBook at path, opened once per worker process, or None if path is None."""
+
+    if path is None:
+        return None
+    if path not in _books:
+        _books[path] = othello_book.OpeningBook(path)
+    return _books[path]
+
+
+def build_game_specs(sizes: [tuple], layouts: [str], first_players: [str], winner_conditions: [str],
+                     strategies: [str], games_per_pairing: int, seed: int,
+                     search_depth: int = DEFAULT_SEARCH_DEPTH, book_path: str = None) -> [GameSpec]:
+    """Returns one GameSpec per game of the tournament: every combination of size, layout, first player, winner
+    condition and ordered (black, white) strategy pair, games_per_pairing times. Each game's seed is drawn from a
+    generator seeded with seed, so the list is the same on every run. Search players use the opening book at
+    book_path, if given."""
+
+    rng = random.Random(seed)
+    specs = []
+    combinations = itertools.product(sizes, layouts, first_players, winner_conditions,
+                                     itertools.product(strategies, repeat=2), range(games_per_pairing))
+    for game_id, (size, layout, first_player, winner_condition, pairing, repeat) in enumerate(combinations):
+        specs.append(GameSpec(game_id, size[0], size[1], layout, first_player, winner_condition,
+                              pairing[0], pairing[1], rng.getrandbits(64), search_depth, book_path))
+    return specs
+
+
+def play_game(spec: GameSpec) -> GameResult:
+    """Plays the game described by spec to the end and returns its GameResult. Runs in a worker process."""
+
+    rng = random.Random(spec.seed)
+    book = _get_book(spec.book_path)
+    players = {1: PLAYER_CLASSES[spec.black_strategy](rng, spec.search_depth, book),
+               -1: PLAYER_CLASSES[spec.white_strategy](rng, spec.search_depth, book)}
+
+    game = OthelloGame()
+    game.BOARD_SIZE = (spec.rows, spec.columns)
+    game.WINNER_CONDITION = spec.winner_condition
+    game.whose_turn = {'B': 1, 'W': -1}[spec.first_player]
+    game.board_state = build_start_board(spec.rows, spec.columns, spec.layout)
+
+    move_times = []
+    while not game.is_game_over():
+        start = time.perf_counter()
+        move = players[game.whose_turn].choose_move(game)
+        move_times.append(time.perf_counter() - start)
+        game.make_move(move)
+
+    piece_counts = game.get_piece_counts()
+    winner = {1: 'B', -1: 'W', None: 'NONE'}[game.get_winner()]
+    mean_move_time = sum(move_times) / len(move_times) if move_times else 0.0
+    max_move_time = max(move_times) if move_times else 0.0
+    return GameResult(spec.game_id, spec.rows, spec.columns, spec.layout, spec.first_player,
+                      spec.winner_condition, spec.black_strategy, spec.white_strategy, spec.seed, winner,
+                      piece_counts.black, piece_counts.white, len(move_times), mean_move_time, max_move_time)
+
+
+class TournamentReport:
+    """Aggregates GameResults, in any order, per variant: board size, layout, first player, winner condition and
+    (black, white) strategy pairing."""
+
+    def __init__(self):
+        """Initializes an empty report."""
+        self._groups = {}
+        self.games = 0
+
+    def add(self, result: GameResult) -> None:
+        """Adds one finished game to its variant's totals."""
+
+        key = ((result.rows, result.columns), result.layout, result.first_player,
+               result.winner_condition, result.black_strategy, result.white_strategy)
+        if key not in self._groups:
+            self._groups[key] = {'games': 0, 'B': 0, 'W': 0, 'NONE': 0, 'black_discs': 0, 'white_discs': 0,
+                                 'moves': 0, 'move_time': 0.0, 'max_move_time': 0.0}
+        group = self._groups[key]
+        group['games'] += 1
+        group[result.winner] += 1
+        group['black_discs'] += result.black
+        group['white_discs'] += result.white
+        group['moves'] += result.moves
+        group['move_time'] += result.mean_move_time * result.moves
+        group['max_move_time'] = max(group['max_move_time'], result.max_move_time)
+        self.games += 1
+
+    def as_rows(self) -> [dict]:
+        """Returns one dictionary per variant, sorted by variant, with win counts and per-game averages."""
+
+        rows = []
+        for key in sorted(self._groups):
+            group = self._groups[key]
+            games = group['games']
+            rows.append({'size': '{}x{}'.format(*key[0]), 'layout': key[1], 'first_player': key[2],
+                         'winner_condition': key[3], 'black_strategy': key[4], 'white_strategy': key[5], 'games': games,
+                         'black_wins': group['B'], 'white_wins': group['W'], 'draws': group['NONE'],
+                         'mean_black_discs': round(group['black_discs'] / games, 3),
+                         'mean_white_discs': round(group['white_discs'] / games, 3),
+                         'mean_moves': round(group['moves'] / games, 3),
+                         'mean_move_time': group['move_time'] / group['moves'] if group['moves'] else 0.0,
+                         'max_move_time': group['max_move_time']})
+        return rows
+
+    def print_table(self, file=sys.stdout) -> None:
+        """Prints the report as a plain text table."""
+
+        print('{:>6} {:>9} {:>3} {:>2} {:>7} {:>7} {:>6} {:>6} {:>6} {:>6} {:>7} {:>9}'.format(
+            'size', 'layout', '1st', 'wc', 'black', 'white', 'games', 'B', 'W', 'NONE', 'moves', 'ms/move'),
+            file=file)
+        for row in self.as_rows():
+            print('{:>6} {:>9} {:>3} {:>2} {:>7} {:>7} {:>6} {:>6} {:>6} {:>6} {:>7.1f} {:>9.3f}'.format(
+                row['size'], row['layout'], row['first_player'], row['winner_condition'], row['black_strategy'],
+                row['white_strategy'], row['games'], row['black_wins'], row['white_wins'], row['draws'],
+                row['mean_moves'], row['mean_move_time'] * 1000), file=file)
+
+
+def run_tournament(specs: [GameSpec], processes: int = None, results_file=None,
+                   chunk_size: int = 4) -> TournamentReport:
+    """Plays every game in specs across a pool of processes (one per core by default). Each result is written
+    to results_file as a JSON line as soon as it finishes, then added to the returned TournamentReport."""
+
+    report = TournamentReport()
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(play_game, specs, chunk_size):
+            if results_file is not None:
+                results_file.write(json.dumps(result._asdict()) + '\n')
+                results_file.flush()
+            report.add(result)
+    return report
+
+
+def parse_size(text: str) -> tuple:
+    """Converts a "ROWSxCOLUMNS" argument into a (rows, columns) tuple of even sizes between 4 and 16."""
+
+    try:
+        rows, columns = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('board sizes look like 8x8')
+    if not (16 >= rows >= 4 and rows % 2 == 0 and 16 >= columns >= 4 and columns % 2 == 0):
+        raise argparse.ArgumentTypeError('Invalid Board Size: Must be even and between 4x4 and 16x16 in size')
+    return rows, columns
+
+
+def main() -> None:
+    """Reads the tournament matrix from the command line, plays it and prints the aggregated report."""
+
+    parser = argparse.ArgumentParser(description='Headless Othello self-play tournament runner.')
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=[(8, 8)])
+    parser.add_argument('--layouts', nargs='+', choices=START_LAYOUTS, default=['standard'])
+    parser.add_argument('--first-players', nargs='+', choices=['B', 'W'], default=['B'])
+    parser.add_argument('--winner-conditions', nargs='+', choices=['>', '<'], default=['>'])
+    parser.add_argument('--strategies', nargs='+', choices=STRATEGIES, default=['random', 'greedy'])
+    parser.add_argument('--games', type=int, default=10, help='games per strategy pairing of each variant')
+    parser.add_argument('--search-depth', type=int, default=DEFAULT_SEARCH_DEPTH)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--book', default=None, help='opening book file for the search players')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--results', type=argparse.FileType('w'), default=None,
+                        help='file to stream one JSON line per game to ("-" for stdout)')
+    parser.add_argument('--report', type=argparse.FileType('w'), default=None,
+                        help='file to write the aggregated report to as JSON')
+    arguments = parser.parse_args()
+
+    specs = build_game_specs(arguments.sizes, arguments.layouts, arguments.first_players,
+                             arguments.winner_conditions, arguments.strategies, arguments.games, arguments.seed,
+                             arguments.search_depth, arguments.book)
+    start = time.perf_counter()
+    report = run_tournament(specs, arguments.processes, arguments.results)
+    elapsed = time.perf_counter() - start
+
+    report.print_table(sys.stderr if arguments.results is sys.stdout else sys.stdout)
+    print('{} games in {:.2f}s ({:.1f} games/s)'.format(report.games, elapsed, report.games / elapsed),
+          file=sys.stderr)
+    if arguments.report is not None:
+        json.dump(report.as_rows(), arguments.report, indent=2)
+
+
+if __name__ == '__main__':
+    main()
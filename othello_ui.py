@@ -3,85 +3,206 @@
 # othello_ui.py
 # This program handles the user-interface (inputs and printing) and game order of the Othello game.
 # the game is started using an if __name__ == "__main__" statement at the bottom which creates an Othello object
-# and calls upon the run_game() function.
+# and calls upon the run_game() function. Passing --computer B or --computer W lets the othello_search engine
+# generate that player's moves instead of reading them, and --batch plays many recorded games from one stream.
 
+import argparse
+import sys
 
 from othello_logic import OthelloGame
 import othello_logic
+import othello_profile
+import othello_search
+import othello_server
 
+HISTORY_COMMANDS = ('UNDO', 'REDO')
+BATCH_FLUSH_LINES = 4096
 
-def run_game():
-    """Main class of the othello user interface module. Controls the flow of the other user-interface functions and sets the values
-    of various othello object properties. """
-
-
-    print("FULL")
 
-    othello_game.BOARD_SIZE = read_board_line_nums()
-    othello_game.whose_turn = read_first_player()
-    othello_game.WINNER_CONDITION = read_winner_condition()
-    othello_game.board_state = read_board_initial_contents(othello_game.BOARD_SIZE)
+def run_game(computer_player: int = None, time_budget: float = othello_search.DEFAULT_TIME_BUDGET,
+             read_line=input, write_line=print, summary_only: bool = False, server_address: str = None,
+             search_engine: othello_search.SearchEngine = None):
+    """Main class of the othello user interface module. Controls the flow of the other user-interface functions and sets the values
+    of various othello object properties. If computer_player is 1 (black) or -1 (white) that player's moves are
+    generated by the search engine within time_budget seconds and printed instead of being read. The engine of the
+    othello_server evaluation server at server_address (or OTHELLO_SERVER) is used when one is running there,
+    unless a search_engine is passed in. Lines are read with read_line and written with write_line (input and
+    print by default). With summary_only only the VALID/INVALID result of each move and the final WINNER are
+    written."""
+
+    if not summary_only:
+        write_line("FULL")
+
+    othello_game.BOARD_SIZE = read_board_line_nums(read_line)
+    othello_game.whose_turn = read_first_player(read_line)
+    othello_game.WINNER_CONDITION = read_winner_condition(read_line)
+    othello_game.board_state = read_board_initial_contents(othello_game.BOARD_SIZE, read_line)
+    if search_engine is None and computer_player is not None:
+        search_engine = othello_server.get_search_engine(time_budget, server_address)
 
     while True:
 
         if othello_game.is_game_over():
-            print_pieces()
-            print_board()
-            print_winner()
+            if not summary_only:
+                print_pieces(write_line)
+                print_board(write_line)
+            print_winner(write_line)
+            othello_profile.dump_stats()
             break
 
-        print_pieces()
-        print_board()
-        print_turn()
+        if not summary_only:
+            print_pieces(write_line)
+            print_board(write_line)
+            print_turn(write_line)
 
         while True:
 
-            move_coordinates = read_move()
             try:
-                othello_game.make_move(move_coordinates)
-                print('VALID')
+                if othello_game.whose_turn == computer_player:
+                    move_coordinates = generate_move(search_engine, write_line, summary_only)
+                else:
+                    move_coordinates = read_move(read_line)
+                if move_coordinates in HISTORY_COMMANDS:
+                    apply_history_command(move_coordinates, computer_player)
+                else:
+                    othello_game.make_move(move_coordinates)
+                write_line('VALID')
                 break
 
             except othello_logic.InvalidMoveError:
-                print('INVALID')
+                write_line('INVALID')
+
+
+def run_batch(input_stream, output_stream, summary_only: bool = False, computer_player: int = None,
+              time_budget: float = othello_search.DEFAULT_TIME_BUDGET, server_address: str = None) -> int:
+    """Plays every game in input_stream one after the other, each in the same FULL format run_game reads (blank
+    lines between games are skipped). Lines are read through the stream's own buffering and the output of each
+    game is collected and written to output_stream in one call, instead of one input() and print() per line.
+    The computer player's search engine is created once for the whole batch. Returns the number of games played.
+    If the stream ends in the middle of a game or a game's size, first player, winner condition or board is
+    malformed, the output so far is written, the game is reported on stderr and the program exits with status 1."""
+
+    global othello_game
+    lines = BatchLines(input_stream)
+    output = []
+    games = 0
+    search_engine = None
+    if computer_player is not None:
+        search_engine = othello_server.get_search_engine(time_budget, server_address)
+    try:
+        try:
+            while lines.has_next_game():
+                othello_game = OthelloGame()
+                run_game(computer_player, time_budget, lines.read_line, output.append, summary_only,
+                         search_engine=search_engine)
+                games += 1
+                if len(output) >= BATCH_FLUSH_LINES:
+                    output_stream.write('\n'.join(output) + '\n')
+                    output = []
+        finally:
+            if len(output) > 0:
+                output_stream.write('\n'.join(output) + '\n')
+            output_stream.flush()
+    except EOFError:
+        print('Game {} of the batch is incomplete: the input ended in the middle of it'.format(games + 1),
+              file=sys.stderr)
+        sys.exit(1)
+    except (ValueError, othello_logic.InvalidBoardError) as error:
+        print('Game {} of the batch is malformed: {}'.format(games + 1, error), file=sys.stderr)
+        sys.exit(1)
+    return games
+
+
+class BatchLines:
+    """Reads the lines of a batch input stream one at a time for run_batch, the way input() would."""
+
+    def __init__(self, stream):
+        """Initializes the reader over the lines of stream."""
+        self._lines = iter(stream)
+        self._pending = None
+
+    def has_next_game(self) -> bool:
+        """Skips blank lines and returns True if another game starts in the stream, False at the end of it."""
+        for line in self._lines:
+            if line.strip() != '':
+                self._pending = line
+                return True
+        return False
+
+    def read_line(self) -> str:
+        """Returns the next line without its line ending. Raises an EOFError at the end of the stream."""
+        if self._pending is not None:
+            line, self._pending = self._pending, None
+        else:
+            line = next(self._lines, None)
+            if line is None:
+                raise EOFError
+        return line.rstrip('\r\n')
+
+
+def apply_history_command(command: str, computer_player: int) -> None:
+    """Undoes (UNDO) or redoes (REDO) one move of the OthelloGame history. When playing against the computer keeps
+    stepping until it is the human player's turn again so the computer does not immediately replay its move.
+    Raises an InvalidMoveError if there is nothing to undo or redo."""
+
+    step = othello_game.undo if command == 'UNDO' else othello_game.redo
+    step()
+    while othello_game.whose_turn == computer_player:
+        try:
+            step()
+        except othello_logic.InvalidMoveError:
+            break
+
 
+def generate_move(search_engine: othello_search.SearchEngine, write_line=print, summary_only: bool = False) -> tuple:
+    """Asks the search engine for the current player's move, prints it in the same "(row) (column)" form a
+    player would type it (unless summary_only) and returns it as a tuple coordinate (row, column)."""
 
-def print_winner():
+    move_coordinates = search_engine.find_best_move(othello_game).move
+    if not summary_only:
+        write_line('{} {}'.format(move_coordinates[0] + 1, move_coordinates[1] + 1))
+    return move_coordinates
+
+
+def print_winner(write_line=print):
     """Takes information from the othello_logic get_winner() class. Converts the Othello object
     values into string representations with the converter dictionary. Prints the Winner. """
 
     winner = othello_game.get_winner()
     converter = {1: 'B', -1: 'W', None: 'NONE'}
-    print('WINNER: {}'.format(converter[winner]))
+    write_line('WINNER: {}'.format(converter[winner]))
 
 
-def print_pieces():
+def print_pieces(write_line=print):
     """Converts the othello_logic class get_piece_counts information into string readable format.
     Prints the number of black and white pieces on the board. """
 
     piece_counts = othello_game.get_piece_counts()
-    print('B: {}  W: {}'.format(piece_counts.black, piece_counts.white))
+    write_line('B: {}  W: {}'.format(piece_counts.black, piece_counts.white))
 
 
-def print_turn():
+def print_turn(write_line=print):
     """Prints whose turn it is (Black or White) to the user interface."""
 
     converter = {1: 'B', -1: 'W', }
-    print('TURN: {}'.format(converter[othello_game.whose_turn]))
+    write_line('TURN: {}'.format(converter[othello_game.whose_turn]))
 
 
-def read_move() -> tuple:
+def read_move(read_line=input) -> tuple or str:
     """Reads the players imput move "(row: int) (column: int)" and returns it as a tuple coordinate (row, column)
-        for use in making a move in the Othello game."""
+        for use in making a move in the Othello game. The commands UNDO and REDO are returned as strings.
+        Raises an InvalidMoveError if the line is not a move."""
 
-    move = input().split(' ')
+    move = read_line().split(' ')
+    if move[0].upper() in HISTORY_COMMANDS:
+        return move[0].upper()
     try:
         return int(move[0]) - 1, int(move[1]) - 1
-    except ValueError:
+    except (ValueError, IndexError):
         raise othello_logic.InvalidMoveError
 
 
-def print_board():
+def print_board(write_line=print):
     """Calls upon the Othello object board_state converting its values into readable strings using
     the converter dictionary. Prints a nicely formatted board with each row representing one printed line."""
 
@@ -91,35 +212,36 @@ def print_board():
         line = ''
         for piece in row:
             line += converter[piece]
-        print(line[:-1])
+        write_line(line[:-1])
 
 
-def read_board_line_nums() -> tuple:
+def read_board_line_nums(read_line=input) -> tuple:
     """Reads two lines of integer input from the console. The first line specifies the numver of rows,
     the second the number of columns. Raise a ValueError if the rows/columns values are not between 4 and 16 and even
-    numbers. Returns a 2 item tuple containing first the rows integer and then the columns integer"""
+    numbers. Returns a 2 item tuple containing first the rows integer and then the columns integer, which is
+    used directly as the OthelloGame BOARD_SIZE."""
 
-    num_of_rows = int(input())
-    num_of_columns = int(input())
+    num_of_rows = int(read_line())
+    num_of_columns = int(read_line())
     if 16 >= num_of_rows >= 4 and num_of_rows % 2 == 0 and 16 >= num_of_columns >= 4 and num_of_columns % 2 == 0:
-        return num_of_rows - 1, num_of_columns - 1
+        return num_of_rows, num_of_columns
     else:
         raise othello_logic.InvalidBoardError('Invalid Board Size: Must be even and between 4x4 and 16x16 in size')
 
 
-def read_first_player() -> int:
+def read_first_player(read_line=input) -> int:
     """Reads a character of input either 'B' or 'W' declaring the first player to move in the game. Verifies that the
     value is one of those two and returns the first_player as a string."""
 
     converter = {'B': 1, 'W': -1}
-    first_player = input().strip(' ')
+    first_player = read_line().strip(' ')
     if first_player == 'B' or first_player == 'W':
         return converter[first_player]
     else:
-        raise ValueError
+        raise ValueError('Invalid First Player: Must be B or W')
 
 
-def read_winner_condition() -> str:
+def read_winner_condition(read_line=input) -> str:
     """Reads the winner condition, verifies it is either '<' or '>'. Raises a value error if not.
     Returns the winner condition as a string.
 
@@ -128,14 +250,14 @@ def read_winner_condition() -> str:
     < means the player with the fewest
     """
 
-    winner_condition = input().strip(' ')
+    winner_condition = read_line().strip(' ')
     if winner_condition == '<' or winner_condition == '>':
         return winner_condition
     else:
-        raise ValueError
+        raise ValueError('Invalid Winner Condition: Must be < or >')
 
 
-def read_board_initial_contents(board_line_nums: tuple) -> [[int]]:
+def read_board_initial_contents(board_line_nums: tuple, read_line=input) -> [[int]]:
     """Reads the player input of initial board contents - one line representing one row of the board.
     Reads line inputs equivalent to the number of rows in the board. Uses the converter dictionary to convert
     piece values to those needed by the Othello object class.
@@ -145,10 +267,10 @@ def read_board_initial_contents(board_line_nums: tuple) -> [[int]]:
     num_of_rows = board_line_nums[0]
     converter = {'.': 0, 'B': 1, 'W': -1}
 
-    for row in range(num_of_rows + 1):
+    for row in range(num_of_rows):
         sublist = []
         try:
-            for piece in input().split(' '):
+            for piece in read_line().split(' '):
                 sublist.append(converter[piece])
         except (ValueError, KeyError):
             raise othello_logic.InvalidBoardError('Invalid Initial Board Piece given.')
@@ -158,5 +280,26 @@ def read_board_initial_contents(board_line_nums: tuple) -> [[int]]:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Console version of the Othello Game.')
+    parser.add_argument('--computer', choices=['B', 'W'],
+                        help='let the search engine generate the moves of this player')
+    parser.add_argument('--time-budget', type=int, default=int(othello_search.DEFAULT_TIME_BUDGET * 1000),
+                        help='milliseconds the search engine may spend on each move')
+    parser.add_argument('--batch', nargs='?', const='-', type=argparse.FileType('r'), metavar='FILE',
+                        help='play every game in FILE (or standard input) one after the other')
+    parser.add_argument('--summary', action='store_true',
+                        help='in batch mode only print VALID/INVALID for each move and the WINNER of each game')
+    parser.add_argument('--server', metavar='ADDRESS',
+                        help='ask the othello_server evaluation server at host:port or a socket path for moves')
+    arguments = parser.parse_args()
+    if arguments.summary and arguments.batch is None:
+        parser.error('--summary can only be used with --batch')
+    computer_player = {'B': 1, 'W': -1, None: None}[arguments.computer]
+
+    othello_profile.enable_from_environment()
     othello_game = OthelloGame()   # Creates a new OthelloGame object titled "othello_game"
-    run_game()
+    if arguments.batch is not None:
+        run_batch(arguments.batch, sys.stdout, arguments.summary, computer_player, arguments.time_budget / 1000,
+                  arguments.server)
+    else:
+        run_game(computer_player, arguments.time_budget / 1000, server_address=arguments.server)
@@ -1,4 +0,0 @@
-def x_squared(x):
-    return x**2
-
-print(x_squared(4))
\ No newline at end of file
@@ -0,0 +1,112 @@
+# test_othello_records.py
+# Tests of the compact game archive: reading records inside a with block and round-tripping empty archives.
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from othello_logic import OthelloGame, build_start_board
+import othello_records
+
+
+class GameRecordReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, 'games.othrec')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _write_games(self, games: int, write_index: bool = True) -> [[tuple]]:
+        """Writes games short 8x8 games to the archive and returns their move lists."""
+
+        move_lists = []
+        with othello_records.GameRecordWriter(self.path, write_index) as writer:
+            for number in range(games):
+                game = OthelloGame()
+                game.BOARD_SIZE = (8, 8)
+                game.WINNER_CONDITION = '>'
+                game.whose_turn = 1
+                game.board_state = build_start_board(8, 8)
+                initial_board = [row[:] for row in game.board_state]
+                moves = []
+                for ply in range(number + 2):
+                    game.is_game_over()
+                    moves.append(game.make_move(sorted(game.get_valid_moves())[0]).coordinates)
+                writer.write_game(8, 8, 1, '>', initial_board, moves)
+                move_lists.append(moves)
+        return move_lists
+
+    def test_iterate_inside_with_block(self):
+        move_lists = self._write_games(3)
+        with othello_records.GameRecordReader(self.path) as reader:
+            for number, record in enumerate(reader):
+                self.assertEqual(othello_records.record_moves(record), move_lists[number])
+        self.assertEqual(othello_records.record_moves(record), move_lists[-1])
+
+    def test_get_inside_with_block(self):
+        move_lists = self._write_games(3)
+        with othello_records.GameRecordReader(self.path) as reader:
+            record = reader.get(1)
+        self.assertEqual(othello_records.record_moves(record), move_lists[1])
+        piece_counts = othello_records.replay_record(record).get_piece_counts()
+        self.assertEqual(piece_counts.black + piece_counts.white, 4 + len(move_lists[1]))
+
+    def test_archive_of_no_games(self):
+        self._write_games(0)
+        self.assertEqual(os.path.getsize(self.path + othello_records.INDEX_SUFFIX), 0)
+        with othello_records.GameRecordReader(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader), [])
+            self.assertRaises(IndexError, reader.get, 0)
+
+    def test_empty_archive_file(self):
+        open(self.path, 'wb').close()
+        self.assertEqual(othello_records.write_index(self.path), 0)
+        with othello_records.GameRecordReader(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader), [])
+
+    def _read_index(self) -> bytes:
+        with open(self.path + othello_records.INDEX_SUFFIX, 'rb') as index:
+            return index.read()
+
+    def test_append_extends_index_without_rescan(self):
+        self._write_games(3)
+        with mock.patch.object(othello_records, 'write_index', side_effect=AssertionError('rescanned')):
+            self._write_games(2)
+        appended = self._read_index()
+        self.assertEqual(othello_records.write_index(self.path), 5)
+        self.assertEqual(appended, self._read_index())
+
+    def test_stale_index_is_rebuilt(self):
+        self._write_games(2)
+        self._write_games(2, write_index=False)
+        self._write_games(1)
+        with othello_records.GameRecordReader(self.path) as reader:
+            self.assertEqual(len(reader), 5)
+            self.assertEqual(len(reader.get(4).moves), 2)
+
+    def test_convert_truncated_transcripts(self):
+        transcripts = os.path.join(self._directory.name, 'games.txt')
+        with open(transcripts, 'w') as transcripts_file:
+            transcripts_file.write('4\n4\nB\n>\nB B . .\nB B . .\n. . . .\n. . . .\n\n'
+                                   '4\n4\nB\n>\n. . . .\n. W B .\n. B W .\n. . . .\n1 3\n')
+        stderr = io.StringIO()
+        with mock.patch.object(sys, 'argv', ['othello_records.py', 'convert', transcripts, self.path]), \
+                mock.patch.object(sys, 'stdout', io.StringIO()), mock.patch.object(sys, 'stderr', stderr):
+            self.assertRaises(SystemExit, othello_records.main)
+        self.assertIn('Game 2', stderr.getvalue())
+        self.assertEqual(len(self._read_index()), 8)
+        with othello_records.GameRecordReader(self.path) as reader:
+            self.assertEqual(len(reader), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()